@@ -4,10 +4,23 @@
 
 Generation of prev/next buttons.
 
+By default only the pages whose prev/next targets changed since the previous
+run (or that were re-rendered since) are visited; the last mapping is kept in
+.quarto/prev-next-state.json. Use --full to visit every post.
+
+Re-rendered pages are told by their mtime. A script run after this one that
+rewrites pages (post_process_cleanup.py) makes them look re-rendered, so the
+next run visits them again; post_render.py runs every stage in one pass and
+saves the state after the last write.
+
 """
 
 from __future__ import annotations
 
+import argparse
+import contextlib
+import json
+import os
 import posixpath
 import re
 import sys
@@ -15,7 +28,23 @@ import xml.etree.ElementTree as ET
 from pathlib import Path
 from urllib.parse import urlparse
 
+from post_index import SITE_POSTS_DIR, get_rendered_posts
+from post_render_pipeline import PipelineContext, register_stage
+from post_render_profile import (
+    add_bytes,
+    add_profile_arguments,
+    is_active,
+    print_report,
+    profile_file,
+    span,
+    write_trace,
+)
+
+HOME_PAGE_PATH = "_site/index.html"
 HREF_PLACEHOLDER_RE = re.compile(r'href="#"')
+PAGINATION_LINK_RE = re.compile(r'<a\b[^>]*\bclass="pagination-link"[^>]*>')
+HREF_ATTR_RE = re.compile(r'(?<=\s)href="[^"]*"')
+DEFAULT_STATE_PATH = Path(".quarto/prev-next-state.json")
 
 
 def log(msg: str, level: str = "INFO") -> None:
@@ -24,6 +53,20 @@ def log(msg: str, level: str = "INFO") -> None:
 
 
 def get_post_names() -> list[str]:
+    """Return the rendered post paths ("<dir>/index.html"), oldest first.
+
+    Built from the post index; the sitemap is only used as a fallback.
+    """
+    post_names = [entry.html_path for entry in get_rendered_posts()]
+    if post_names:
+        log(f"Found {len(post_names)} posts in {SITE_POSTS_DIR}")
+        return post_names
+
+    log(f"No rendered posts found in {SITE_POSTS_DIR}, falling back to sitemap", "WARNING")
+    return get_post_names_from_sitemap()
+
+
+def get_post_names_from_sitemap() -> list[str]:
     sitemap_path = Path("_site/sitemap.xml")
     if not sitemap_path.exists():
         log(f"Sitemap not found at {sitemap_path}", "ERROR")
@@ -124,9 +167,159 @@ def replace_href_placeholders(text: str, prev_link: str, next_link: str) -> str:
     return HREF_PLACEHOLDER_RE.sub(repl, text)
 
 
-def inject_prev_next_into_posts(prev_next_links: dict[str, dict[str, str]]) -> int:
+def relink_pagination_links(text: str, prev_link: str, next_link: str) -> str:
+    """Point already linked prev/next buttons to new targets, alternating."""
+    i = 0
+
+    def repl(match: re.Match[str]) -> str:
+        nonlocal i
+        link = prev_link if i % 2 == 0 else next_link
+        i += 1
+        return HREF_ATTR_RE.sub(lambda _: f'href="{link}"', match.group(0), count=1)
+
+    return PAGINATION_LINK_RE.sub(repl, text)
+
+
+def relabel_home_navigation(text: str) -> str:
+    """Rename the home page buttons, which point to the newest/oldest posts."""
+    text = re.sub(r">Précédent<", ">Dernier billet<", text)
+    return re.sub(r">Suivant<", ">Premier billet<", text)
+
+
+def get_home_page_links(post_names: list[str]) -> tuple[str, str]:
+    """Return (prev, next) for the home page: newest post, oldest post."""
+    oldest_target = f"posts/{post_names[0]}"
+    newest_target = f"posts/{post_names[-1]}"
+    home_dir = posixpath.dirname("index.html")
+
+    prev_link = posixpath.relpath(newest_target, home_dir or ".")
+    next_link = posixpath.relpath(oldest_target, home_dir or ".")
+    return prev_link, next_link
+
+
+def build_nav_links(post_names: list[str]) -> dict[str, tuple[str, str]]:
+    """Map each "_site/..." page to its (prev, next) links, home page included."""
+    nav_links = {
+        f"_site/posts/{post_path}": (links["prev"], links["next"])
+        for post_path, links in get_prev_next_links(post_names).items()
+    }
+    if post_names:
+        nav_links[HOME_PAGE_PATH] = get_home_page_links(post_names)
+    return nav_links
+
+
+@register_stage("prev_next")
+def prev_next_stage(
+    text: str, file_path: Path, context: PipelineContext
+) -> tuple[str, dict[str, int]]:
+    links = context.nav_links.get(file_path.as_posix())
+    if links is None:
+        return text, {}
+    if 'href="#"' in text:
+        updated = replace_href_placeholders(text, *links)
+    else:
+        updated = relink_pagination_links(text, *links)
+    if file_path.as_posix() == HOME_PAGE_PATH:
+        updated = relabel_home_navigation(updated)
+    return updated, {"prev_next_updated": int(updated != text)}
+
+
+def load_nav_state(state_path: Path = DEFAULT_STATE_PATH) -> dict:
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def save_nav_state(
+    nav_links: dict[str, tuple[str, str]], state_path: Path = DEFAULT_STATE_PATH
+) -> None:
+    """Record the mapping and the mtime of each page as left by this run."""
+    mtimes = {}
+    for page_path in nav_links:
+        try:
+            mtimes[page_path] = os.stat(page_path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+    state = {"links": {page: list(links) for page, links in nav_links.items()}, "mtimes": mtimes}
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, state_path)
+
+
+def get_changed_nav_pages(
+    nav_links: dict[str, tuple[str, str]], state: dict, check_mtimes: bool = True
+) -> set[str]:
+    """Return the "_site/..." pages whose links differ from the stored state.
+
+    With check_mtimes, pages modified since the state was saved (typically
+    re-rendered by Quarto, hence with placeholders again) are included too.
+    """
+    old_links = state.get("links", {})
+    old_mtimes = state.get("mtimes", {})
+    changed = set()
+    for page_path, links in nav_links.items():
+        if old_links.get(page_path) != list(links):
+            changed.add(page_path)
+            continue
+        if check_mtimes:
+            try:
+                mtime = os.stat(page_path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != old_mtimes.get(page_path):
+                changed.add(page_path)
+    return changed
+
+
+def inject_prev_next_into_post(html_path: Path, links: dict[str, str], relink: bool) -> str:
+    """Update one post and return what happened to it.
+
+    One of "updated", "relinked", "already_linked", "no_nav_block" or
+    "unchanged".
+    """
+    with span("read"):
+        original = html_path.read_text(encoding="utf-8")
+    if is_active():
+        add_bytes(read=len(original.encode("utf-8")))
+    if 'href="#"' not in original:
+        if 'class="page-navigation"' not in original or 'class="pagination-link"' not in original:
+            return "no_nav_block"
+        if relink:
+            with span("prev_next"):
+                updated = relink_pagination_links(original, links["prev"], links["next"])
+            if updated != original:
+                write_post(html_path, updated)
+                return "relinked"
+        return "already_linked"
+    with span("prev_next"):
+        updated = replace_href_placeholders(original, links["prev"], links["next"])
+    if updated == original:
+        return "unchanged"
+    write_post(html_path, updated)
+    return "updated"
+
+
+def write_post(html_path: Path, text: str) -> None:
+    with span("write"):
+        html_path.write_text(text, encoding="utf-8")
+    if is_active():
+        add_bytes(written=len(text.encode("utf-8")))
+
+
+def inject_prev_next_into_posts(
+    prev_next_links: dict[str, dict[str, str]],
+    relink: bool = False,
+    profiles: list[dict] | None = None,
+) -> int:
     """Inject prev/next links directly in rendered _site post files.
 
+    With relink, posts that are already linked get their links updated too.
+    When profiles is a list, a post_render_profile record is appended to it
+    for each post visited.
+
     Returns:
         Number of files updated.
     """
@@ -142,18 +335,21 @@ def inject_prev_next_into_posts(prev_next_links: dict[str, dict[str, str]]) -> i
             log(f"File not found: {post_path}", "WARNING")
             missing_count += 1
             continue
-        original = html_path.read_text(encoding="utf-8")
-        if 'href="#"' not in original:
+        with profile_file(html_path.as_posix(), profiles is not None) as file_profile:
+            status = inject_prev_next_into_post(html_path, links, relink)
+        if file_profile is not None:
+            profiles.append(file_profile.record())
+        if status == "updated":
+            updated_count += 1
+        elif status == "already_linked":
+            no_placeholder_count += 1
+            already_linked_count += 1
+        elif status == "no_nav_block":
+            no_placeholder_count += 1
+            no_nav_block_count += 1
+            log(f"No navigation block found in {post_path}", "WARNING")
+        elif status == "relinked":
             no_placeholder_count += 1
-            if 'class="page-navigation"' in original and 'class="pagination-link"' in original:
-                already_linked_count += 1
-            else:
-                no_nav_block_count += 1
-                log(f"No navigation block found in {post_path}", "WARNING")
-            continue
-        updated = replace_href_placeholders(original, links["prev"], links["next"])
-        if updated != original:
-            html_path.write_text(updated, encoding="utf-8")
             updated_count += 1
 
     if missing_count > 0:
@@ -168,13 +364,15 @@ def inject_prev_next_into_posts(prev_next_links: dict[str, dict[str, str]]) -> i
     return updated_count
 
 
-def inject_prev_next_into_home_page(post_names: list[str]) -> bool:
+def inject_prev_next_into_home_page(post_names: list[str], relink: bool = False) -> bool:
     """Inject prev/next links in _site/index.html only.
 
     Home page behavior:
       - prev -> most recent post
       - next -> oldest post
 
+    With relink, already linked buttons get their links updated too.
+
     Returns:
         True if home page was updated, False otherwise.
     """
@@ -182,22 +380,19 @@ def inject_prev_next_into_home_page(post_names: list[str]) -> bool:
         log("No posts available for home page navigation", "WARNING")
         return False
 
-    home_path = Path("_site/index.html")
+    home_path = Path(HOME_PAGE_PATH)
     if not home_path.exists():
-        log("Home page not found at _site/index.html", "WARNING")
+        log(f"Home page not found at {HOME_PAGE_PATH}", "WARNING")
         return False
 
-    oldest_target = f"posts/{post_names[0]}"
-    newest_target = f"posts/{post_names[-1]}"
-    home_dir = posixpath.dirname("index.html")
-
-    prev_link = posixpath.relpath(newest_target, home_dir or ".")
-    next_link = posixpath.relpath(oldest_target, home_dir or ".")
+    prev_link, next_link = get_home_page_links(post_names)
 
     original = home_path.read_text(encoding="utf-8")
-    updated = replace_href_placeholders(original, prev_link, next_link)
-    updated = re.sub(r">Précédent<", ">Dernier billet<", updated)
-    updated = re.sub(r">Suivant<", ">Premier billet<", updated)
+    if relink and 'href="#"' not in original:
+        updated = relink_pagination_links(original, prev_link, next_link)
+    else:
+        updated = replace_href_placeholders(original, prev_link, next_link)
+    updated = relabel_home_navigation(updated)
     if updated != original:
         home_path.write_text(updated, encoding="utf-8")
         log("Updated home page navigation")
@@ -208,16 +403,54 @@ def inject_prev_next_into_home_page(post_names: list[str]) -> bool:
 
 
 def main() -> dict[str, dict[str, str]]:
-    log("Starting prev/next navigation generation")
-    post_names = get_post_names()
-    prev_next_links = get_prev_next_links(post_names)
+    parser = argparse.ArgumentParser(description="Generate prev/next buttons.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Visit every post instead of only those whose links changed.",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiles: list[dict] | None = [] if args.profile else None
 
-    posts_updated = inject_prev_next_into_posts(prev_next_links)
-    home_updated = inject_prev_next_into_home_page(post_names)
+    log("Starting prev/next navigation generation")
+    with profile_file("(post index)", args.profile) as index_profile:
+        with span("get_post_names"):
+            post_names = get_post_names()
+        with span("get_prev_next_links"):
+            prev_next_links = get_prev_next_links(post_names)
+            nav_links = build_nav_links(post_names)
+    if index_profile is not None:
+        profiles.append(index_profile.record())
+
+    state = {} if args.full else load_nav_state()
+    if state:
+        changed_pages = get_changed_nav_pages(nav_links, state)
+        posts_to_visit = {
+            post_path: links
+            for post_path, links in prev_next_links.items()
+            if f"_site/posts/{post_path}" in changed_pages
+        }
+        log(f"Incremental run: {len(posts_to_visit)}/{len(prev_next_links)} posts to visit")
+        posts_updated = inject_prev_next_into_posts(posts_to_visit, relink=True, profiles=profiles)
+        home_updated = False
+        if HOME_PAGE_PATH in changed_pages:
+            home_updated = inject_prev_next_into_home_page(post_names, relink=True)
+    else:
+        posts_updated = inject_prev_next_into_posts(prev_next_links, profiles=profiles)
+        home_updated = inject_prev_next_into_home_page(post_names)
+    save_nav_state(nav_links)
 
     log(f"✓ Updated {posts_updated} post files with navigation links")
     if home_updated:
         log("✓ Updated home page with navigation links")
+    if profiles is not None:
+        # The report goes to stderr with the rest of this script's log.
+        with contextlib.redirect_stdout(sys.stderr):
+            print_report(profiles, args.profile_top)
+        if args.profile_trace:
+            write_trace(profiles, args.profile_trace)
+            log(f"Profile trace written to {args.profile_trace}")
 
     return prev_next_links
 
@@ -0,0 +1,182 @@
+"""
+Content fingerprinting of the local assets of _site.
+
+A tag that carries append-hash="true" (Quarto writes it on its bootstrap
+stylesheet, which holds the custom theme; _includes/scripts.html on
+scripts.js) gets the URL of its asset rewritten to a copy named
+name.<hash>.ext, next to the original so that the relative URLs of a CSS
+file still resolve. The name changes with the content, so these copies can
+be served with an immutable, long-lived Cache-Control header.
+
+The cleanup stages rewrite .css/.js files too, so post_render.py processes
+those first; build_asset_index() then hashes every local asset in
+its final state, once per run, and the pages are processed. The cleanup
+engines rewrite the references of a page in their single pass over it, and
+write the copies the first time they are referenced. References to an
+earlier copy (pages whose append-hash was already consumed) are updated as
+well. write_manifest() records the copies in _site/asset-manifest.json and
+removes the ones of previous builds.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+from pathlib import Path
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+SITE_ROOT = Path("_site")
+MANIFEST_NAME = "asset-manifest.json"
+FINGERPRINT_SUFFIXES = {".css", ".js"}
+HASH_LENGTH = 10
+# The name.<hash>.ext copies written by this module.
+FINGERPRINTED_NAME_RE = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}(?=\.[^./]+$)")
+# Tags whose asset URL is rewritten even without append-hash, when it already
+# points at a copy.
+ASSET_TAGS = {"script": "src", "link": "href"}
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest[:HASH_LENGTH]}{dot}{suffix}"
+
+
+def build_asset_index(root: Path = SITE_ROOT) -> dict[str, str]:
+    """Return {asset path: fingerprinted path}, both relative to root."""
+    index = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if (
+                Path(filename).suffix.lower() not in FINGERPRINT_SUFFIXES
+                or FINGERPRINTED_NAME_RE.search(filename)
+            ):
+                continue
+            path = Path(dirpath) / filename
+            key = path.relative_to(root).as_posix()
+            index[key] = posixpath.join(
+                posixpath.dirname(key), fingerprinted_name(filename, file_digest(path))
+            )
+    return index
+
+
+def asset_path(url: str, page_path: Path, root: Path = SITE_ROOT) -> str | None:
+    """Return the path relative to root that url points at from page_path."""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if path.startswith("/"):
+        path = posixpath.normpath(path.lstrip("/"))
+    else:
+        page_dir = Path(os.path.relpath(page_path.parent, root)).as_posix()
+        path = posixpath.normpath(posixpath.join(page_dir, path))
+    return None if path.startswith("..") else path
+
+
+def write_copy(source: Path, target: Path) -> None:
+    """Copy source to target unless done; the hash in the name vouches for it."""
+    if target.is_file():
+        return
+    # Several workers can reference the same asset at once.
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def fingerprint_reference(
+    tag: str,
+    attrs: dict[str, str],
+    page_path: Path,
+    asset_index: dict[str, str],
+    root: Path = SITE_ROOT,
+    write_copies: bool = True,
+) -> tuple[str, str] | None:
+    """Return (attribute, fingerprinted URL) for a tag, or None to keep it.
+
+    With write_copies, the fingerprinted copy of the asset is written if it
+    does not exist yet.
+    """
+    if not asset_index:
+        return None
+    attribute = "src" if "src" in attrs else "href" if "href" in attrs else None
+    if attribute is None:
+        return None
+    url = attrs[attribute] or ""
+    if "append-hash" not in attrs and not (
+        ASSET_TAGS.get(tag) == attribute and FINGERPRINTED_NAME_RE.search(url)
+    ):
+        return None
+    path = asset_path(url, page_path, root)
+    if path is None:
+        return None
+    if path not in asset_index:
+        # Already rewritten by a previous build, maybe with another hash.
+        path = FINGERPRINTED_NAME_RE.sub("", path, count=1)
+        if path not in asset_index:
+            return None
+    target = asset_index[path]
+    if write_copies:
+        write_copy(root / path, root / target)
+
+    parts = urlsplit(url.strip())
+    directory, slash, _ = parts.path.rpartition("/")
+    updated = urlunsplit(parts._replace(path=directory + slash + posixpath.basename(target)))
+    return None if updated == url else (attribute, updated)
+
+
+def load_manifest(root: Path = SITE_ROOT) -> dict[str, str]:
+    try:
+        manifest = json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def manifest_outdated(manifest: dict[str, str], asset_index: dict[str, str]) -> bool:
+    """Tell if an asset of manifest changed, so pages point at a stale copy."""
+    return any(asset_index.get(path) != target for path, target in manifest.items())
+
+
+def write_manifest(
+    asset_index: dict[str, str], root: Path = SITE_ROOT
+) -> tuple[dict[str, str], list[Path]]:
+    """Write root/asset-manifest.json; return (manifest, stale copies removed).
+
+    The manifest maps each asset with a fingerprinted copy to that copy.
+    Copies listed by the previous manifest that no longer match the content
+    of their asset are removed.
+    """
+    manifest_path = root / MANIFEST_NAME
+    previous = load_manifest(root)
+    manifest = {
+        path: target
+        for path, target in sorted(asset_index.items())
+        if (root / target).is_file()
+    }
+    removed = []
+    for target in set(previous.values()) - set(manifest.values()):
+        stale = root / str(target)
+        if FINGERPRINTED_NAME_RE.search(stale.name) and stale.is_file():
+            stale.unlink()
+            removed.append(stale)
+    if manifest or previous:
+        tmp_path = manifest_path.with_name(f".{MANIFEST_NAME}.tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp_path, manifest_path)
+    return manifest, removed
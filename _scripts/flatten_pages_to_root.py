@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+"""
+Move the directories of _site/pages to the root of _site.
+
+/pages/radios/ is served as /radios/, and /pages/index.html stays in place.
+A directory that does not exist at the root yet is moved with a single
+os.replace(). Otherwise the two trees are merged file by file: each new or
+modified file replaces its previous version with os.replace(), so a page is
+never missing, and files whose source did not change since the previous
+build are left untouched (the output of the cleanup stage is kept). Files
+that are no longer in the source are removed.
+
+A source file is unchanged when its size and mtime, or failing that its
+hash, match the version moved by the previous build, recorded in
+.quarto/flatten-pages.json. The files moved and removed are listed in the
+output. The stages that follow need no list of them: post_render.py skips a
+file when its content hash matches its cache, so the untouched files keep
+their cleaned-up output and the moved ones are processed again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+DEFAULT_STATE_PATH = Path(".quarto/flatten-pages.json")
+
+
+def log(message: str) -> None:
+    print(f"[flatten-pages] {message}", file=sys.stderr)
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state(state_path: Path) -> dict[str, list]:
+    try:
+        data = json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_json(path: Path, data: object) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def iter_files(root: Path):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            yield Path(dirpath) / filename
+
+
+def source_signature(path: Path, known: list | None) -> list:
+    """Return [size, mtime_ns, sha256] of path, hashing only when needed."""
+    stat = path.stat()
+    if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+        return known
+    if known and known[0] != stat.st_size:
+        return [stat.st_size, stat.st_mtime_ns, None]
+    return [stat.st_size, stat.st_mtime_ns, file_digest(path)]
+
+
+def remove_path(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+
+
+def move_tree(source: Path, target: Path, state: dict[str, list]) -> list[Path]:
+    """Move source to target as a whole; return the files moved."""
+    if target.exists() or target.is_symlink():
+        remove_path(target)  # a file where the directory goes
+    os.replace(source, target)
+    moved = list(iter_files(target))
+    for path in moved:
+        stat = path.stat()
+        state[path.as_posix()] = [stat.st_size, stat.st_mtime_ns, file_digest(path)]
+    return moved
+
+
+def merge_tree(
+    source: Path, target: Path, state: dict[str, list]
+) -> tuple[list[Path], list[Path], int]:
+    """Move the changed files of source into target.
+
+    Returns (files moved, stale files removed, files unchanged).
+    """
+    moved: list[Path] = []
+    unchanged = 0
+    seen: set[str] = set()
+    for source_file in iter_files(source):
+        target_file = target / source_file.relative_to(source)
+        key = target_file.as_posix()
+        seen.add(key)
+        known = state.get(key)
+        signature = source_signature(source_file, known)
+        if known and signature[2] is not None and signature[2] == known[2] and target_file.is_file():
+            source_file.unlink()
+            unchanged += 1
+            continue
+        for parent in reversed(target_file.parents):
+            if parent.exists() and not parent.is_dir():
+                parent.unlink()  # a file where a directory goes
+        target_file.parent.mkdir(parents=True, exist_ok=True)
+        if target_file.is_dir():
+            shutil.rmtree(target_file)
+        os.replace(source_file, target_file)
+        if signature[2] is None:
+            signature[2] = file_digest(target_file)
+        state[key] = signature
+        moved.append(target_file)
+
+    removed = []
+    for target_file in list(iter_files(target)):
+        if target_file.as_posix() not in seen:
+            target_file.unlink()
+            state.pop(target_file.as_posix(), None)
+            removed.append(target_file)
+    # Directories left empty by removed files, deepest first.
+    for dirpath, _, _ in sorted(os.walk(target), key=lambda entry: -len(entry[0])):
+        if Path(dirpath) != target and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    shutil.rmtree(source)
+    return moved, removed, unchanged
+
+
+def flatten(
+    src: Path, dst: Path, state: dict[str, list]
+) -> tuple[list[Path], list[Path], int]:
+    """Flatten every directory of src into dst; return moved, removed, unchanged."""
+    moved: list[Path] = []
+    removed: list[Path] = []
+    unchanged = 0
+    for entry in sorted(src.iterdir()):
+        if not entry.is_dir():
+            continue
+        target = dst / entry.name
+        if target.is_dir():
+            entry_moved, entry_removed, entry_unchanged = merge_tree(entry, target, state)
+            removed += entry_removed
+            unchanged += entry_unchanged
+            log(
+                f"  Merged: {entry.name} -> {target} ({len(entry_moved)} moved, "
+                f"{len(entry_removed)} removed, {entry_unchanged} unchanged)"
+            )
+        else:
+            entry_moved = move_tree(entry, target, state)
+            log(f"  Moved: {entry.name} -> {target} ({len(entry_moved)} files)")
+        moved += entry_moved
+    return moved, removed, unchanged
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Move _site/pages/* to the root of _site.")
+    parser.add_argument("--src", type=Path, default=Path("_site/pages"), help="Pages directory.")
+    parser.add_argument("--dst", type=Path, default=Path("_site"), help="Site root.")
+    parser.add_argument(
+        "--state",
+        type=Path,
+        default=DEFAULT_STATE_PATH,
+        help=f"Signatures of the files moved (default: {DEFAULT_STATE_PATH}).",
+    )
+    args = parser.parse_args()
+
+    if not args.src.is_dir():
+        log(f"No pages directory found at {args.src}, skipping")
+        return 0
+
+    log(f"Starting page flattening from {args.src} to {args.dst}")
+    state = load_state(args.state)
+    try:
+        moved, removed, unchanged = flatten(args.src, args.dst, state)
+    except OSError as exc:
+        log(f"ERROR: {exc}")
+        return 1
+    finally:
+        # Files already moved are recorded even if a later one failed.
+        save_json(args.state, state)
+
+    for path in moved:
+        print(f"moved: {path}")
+    for path in removed:
+        print(f"removed: {path}")
+    log(
+        f"✓ {len(moved)} file(s) moved, {len(removed)} removed, "
+        f"{unchanged} unchanged"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+"""
+Gremlin scanner: invisible or invalid characters in text files.
+
+All the ranges of GREMLIN_RANGES are compiled into one regular expression,
+so each file is scanned in a single pass, whatever the number of ranges.
+Files are scanned in a process pool and every hit is reported as
+file:line:col, followed by a histogram per range.
+
+GREMLIN_FIXES is the table of known gremlins and their replacement. The
+post-render cleanup stage applies it with its REPLACEMENTS rules and counts
+the gremlins left, in the same pass over each file of _site: it matches the
+single character class GREMLIN_CHARS, much cheaper than GREMLIN_RE, and
+names the range of each hit with gremlin_range().
+
+Replaces _tools/detect_gremlins.sh, which only checked the first
+private-use area.
+
+usage:
+python3 _scripts/gremlins.py [PATH...] [-j N] [--json report.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+# name -> regex character class, in reporting order.
+GREMLIN_RANGES: dict[str, str] = {
+    "private_use": r"\ue000-\uf8ff",
+    "private_use_plane_15": r"\U000f0000-\U000fffff",
+    "private_use_plane_16": r"\U00100000-\U0010ffff",
+    # Except tab, line feed and carriage return.
+    "c0_control": r"\x00-\x08\x0b\x0c\x0e-\x1f",
+    "c1_control": r"\x7f-\x9f",
+    "zero_width_bidi": r"\u200b-\u200f\u202a-\u202e\u2060-\u2064\u206a-\u206f",
+    "line_separator": r"\u2028\u2029",
+    "noncharacter": r"\ufdd0-\ufdef\ufffe\uffff",
+    "specials": r"\ufff0-\ufffc",
+    "replacement_char": r"\ufffd",
+    # Undecodable bytes, read with surrogateescape.
+    "surrogate": r"\ud800-\udfff",
+}
+# A byte order mark is only a gremlin after the start of the file.
+STRAY_BOM = r"(?<=[\s\S])\ufeff"
+
+# Known gremlins and their replacement, applied by post_process_cleanup.py.
+GREMLIN_FIXES: dict[str, str] = {
+    # Icon of a private-use font, pasted as text.
+    "\ue9cb": "\U0001f60e",
+}
+
+GREMLIN_RE = re.compile(
+    "|".join(
+        [f"(?P<{name}>[{chars}])" for name, chars in GREMLIN_RANGES.items()]
+        + [f"(?P<stray_bom>{STRAY_BOM})"]
+    )
+)
+RANGE_NAMES = (*GREMLIN_RANGES, "stray_bom")
+# Every range and the byte order mark, in one class; see gremlin_range().
+GREMLIN_CHARS = "[" + "".join(GREMLIN_RANGES.values()) + "\ufeff]"
+RANGE_RES = {name: re.compile(f"[{chars}]") for name, chars in GREMLIN_RANGES.items()}
+SKIP_DIRS = {".git", ".quarto", "node_modules", "__pycache__", ".venv", "venv"}
+# Files with a NUL byte in their first block are binary, as for ripgrep.
+BINARY_SNIFF_SIZE = 8192
+
+
+def gremlin_range(char: str, position: int) -> str | None:
+    """Return the range name of a GREMLIN_CHARS hit at position in its text.
+
+    None for a byte order mark at the start of the text, which is legit.
+    """
+    if char == "\ufeff":
+        return "stray_bom" if position else None
+    return next(name for name, range_re in RANGE_RES.items() if range_re.match(char))
+
+
+def find_gremlins(content: str) -> list[tuple[int, int, str, str]]:
+    """Return (line, column, character, range name) of each gremlin, 1-based."""
+    hits = []
+    line_starts: list[int] | None = None
+    for match in GREMLIN_RE.finditer(content):
+        if line_starts is None:
+            line_starts = [0] + [m.end() for m in re.finditer("\n", content)]
+        line = bisect.bisect_right(line_starts, match.start())
+        column = match.start() - line_starts[line - 1] + 1
+        hits.append((line, column, match.group(), match.lastgroup))
+    return hits
+
+
+def scan_file(path: Path) -> list[tuple[int, int, str, str]] | None:
+    """Return the gremlins of a file, or None for a binary file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if b"\0" in data[:BINARY_SNIFF_SIZE]:
+        return None
+    return find_gremlins(data.decode("utf-8", errors="surrogateescape"))
+
+
+def iter_text_files(paths: Iterable[Path]) -> Iterable[Path]:
+    for path in paths:
+        if path.is_file():
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(name for name in dirnames if name not in SKIP_DIRS)
+            for filename in sorted(filenames):
+                yield Path(dirpath) / filename
+
+
+def format_char(char: str) -> str:
+    if "\udc80" <= char <= "\udcff":
+        return f"byte 0x{ord(char) - 0xDC00:02X}"
+    return f"U+{ord(char):04X}"
+
+
+def print_histogram(histogram: dict[str, int], width: int = 40) -> None:
+    largest = max(histogram.values(), default=0)
+    for name in RANGE_NAMES:
+        count = histogram.get(name, 0)
+        bar = "#" * (round(count * width / largest) if largest else 0)
+        if count and not bar:
+            bar = "#"
+        print(f"  {name:<21} {count:>7} {bar}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Find invisible or invalid characters.")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["."],
+        help="Files or directories to scan (default: current directory).",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count, 1 = serial).",
+    )
+    parser.add_argument("--json", type=Path, help="Also write the hits to this JSON file.")
+    args = parser.parse_args()
+
+    files = list(iter_text_files(Path(p) for p in args.paths))
+    if args.jobs <= 1 or len(files) <= 1:
+        hits_per_file = list(map(scan_file, files))
+    else:
+        workers = min(args.jobs, len(files))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(files) // (workers * 4))
+            hits_per_file = list(executor.map(scan_file, files, chunksize=chunksize))
+
+    histogram: dict[str, int] = {}
+    report = []
+    files_with_gremlins = 0
+    text_files = 0
+    for path, hits in zip(files, hits_per_file):
+        if hits is None:
+            continue
+        text_files += 1
+        if hits:
+            files_with_gremlins += 1
+        for line, column, char, name in hits:
+            histogram[name] = histogram.get(name, 0) + 1
+            print(f"{path}:{line}:{column}: {format_char(char)} {name}")
+            report.append(
+                {
+                    "file": path.as_posix(),
+                    "line": line,
+                    "column": column,
+                    "char": format_char(char),
+                    "range": name,
+                }
+            )
+
+    total = sum(histogram.values())
+    print(f"\ngremlins: {total} in {files_with_gremlins} file(s), {text_files} text file(s) scanned")
+    print_histogram(histogram)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    return 1 if total else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
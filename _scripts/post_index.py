@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+"""
+Index of the blog posts.
+
+Builds the list of posts (oldest first) from the dated directory names under
+posts/, with date, title and slug read from each index.qmd front matter. The
+front matter is cached in .quarto/post-index.json and only re-read for posts
+whose directory or index.qmd changed since the previous run.
+
+usage:
+python3 _scripts/post_index.py
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import yaml
+
+POSTS_DIR = Path("posts")
+SITE_POSTS_DIR = Path("_site/posts")
+DEFAULT_CACHE_PATH = Path(".quarto/post-index.json")
+POST_DIR_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})-(.+)$")
+FRONT_MATTER_RE = re.compile(r"\A---[ \t]*\n(.*?)\n---[ \t]*(?:\n|\Z)", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class PostEntry:
+    name: str  # directory name, e.g. "2014-12-03-manipulation_des_ports"
+    date: str
+    title: str
+    slug: str
+    draft: bool = False
+
+    @property
+    def html_path(self) -> str:
+        """Path relative to posts/ of the rendered page."""
+        return f"{self.name}/index.html"
+
+
+def post_sort_key(name: str) -> str:
+    # Same order as the sorted post URLs of the sitemap ("<name>/").
+    return f"{name}/"
+
+
+def read_front_matter(qmd_path: Path) -> dict:
+    try:
+        text = qmd_path.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return {}
+    match = FRONT_MATTER_RE.match(text)
+    if not match:
+        return {}
+    try:
+        data = yaml.safe_load(match.group(1))
+    except yaml.YAMLError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def parse_post(name: str, qmd_path: Path) -> PostEntry:
+    dir_match = POST_DIR_RE.match(name)
+    dir_date, slug = dir_match.groups() if dir_match else ("", name)
+    front_matter = read_front_matter(qmd_path)
+    date = front_matter.get("date")
+    return PostEntry(
+        name=name,
+        date=str(date) if date is not None else dir_date,
+        title=str(front_matter.get("title") or slug),
+        slug=slug,
+        draft=bool(front_matter.get("draft", False)),
+    )
+
+
+def load_cache(cache_path: Path) -> dict[str, dict]:
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    posts = data.get("posts") if isinstance(data, dict) else None
+    return posts if isinstance(posts, dict) else {}
+
+
+def save_cache(cache_path: Path, posts: dict[str, dict]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    tmp_path.write_text(json.dumps({"posts": posts}, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, cache_path)
+
+
+def build_post_index(
+    posts_dir: Path = POSTS_DIR, cache_path: Path | None = DEFAULT_CACHE_PATH
+) -> list[PostEntry]:
+    """Return every post found in posts_dir, drafts included, oldest first."""
+    cached = load_cache(cache_path) if cache_path else {}
+    posts: dict[str, dict] = {}
+    entries: list[PostEntry] = []
+
+    try:
+        dir_entries = list(os.scandir(posts_dir))
+    except FileNotFoundError:
+        return []
+
+    for dir_entry in dir_entries:
+        if not dir_entry.is_dir() or not POST_DIR_RE.match(dir_entry.name):
+            continue
+        qmd_path = Path(dir_entry.path) / "index.qmd"
+        try:
+            key = [dir_entry.stat().st_mtime_ns, qmd_path.stat().st_mtime_ns]
+        except FileNotFoundError:
+            continue
+
+        record = cached.get(dir_entry.name)
+        if record and record.get("key") == key:
+            entry = PostEntry(**record["entry"])
+        else:
+            entry = parse_post(dir_entry.name, qmd_path)
+        posts[entry.name] = {"key": key, "entry": asdict(entry)}
+        entries.append(entry)
+
+    if cache_path and posts != cached:
+        save_cache(cache_path, posts)
+
+    entries.sort(key=lambda entry: post_sort_key(entry.name))
+    return entries
+
+
+def get_rendered_posts(
+    site_posts_dir: Path = SITE_POSTS_DIR,
+    posts_dir: Path = POSTS_DIR,
+    cache_path: Path | None = DEFAULT_CACHE_PATH,
+) -> list[PostEntry]:
+    """Return the non-draft posts rendered in site_posts_dir, oldest first.
+
+    Rendered posts without a source directory are kept, with metadata taken
+    from the directory name only.
+    """
+    try:
+        rendered = [
+            dir_entry.name
+            for dir_entry in os.scandir(site_posts_dir)
+            if dir_entry.is_dir() and os.path.isfile(os.path.join(dir_entry.path, "index.html"))
+        ]
+    except FileNotFoundError:
+        return []
+
+    index = {entry.name: entry for entry in build_post_index(posts_dir, cache_path)}
+    entries = []
+    for name in sorted(rendered, key=post_sort_key):
+        entry = index.get(name) or parse_post(name, Path(os.devnull))
+        if not entry.draft:
+            entries.append(entry)
+    return entries
+
+
+def main() -> int:
+    for entry in build_post_index():
+        draft = " (draft)" if entry.draft else ""
+        print(f"{entry.date}\t{entry.slug}\t{entry.title}{draft}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,30 +4,113 @@
 Post-processing cleanup script.
 
 This script is intentionally simple and can be extended over time by adding
-new replacement rules in REPLACEMENTS.
+new replacement rules in REPLACEMENTS. All rules are applied in a single pass
+over each file (a replacement target is never rescanned by another rule).
+
+Only the cleanup stages are run here. Asset fingerprinting needs every
+asset processed before the pages and a manifest of the copies, which
+post_render.py takes care of.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import inspect
+import os
 import random
+import re
+from html import escape
+from html.parser import HTMLParser
 from pathlib import Path
 from typing import Iterable
+from urllib.parse import urlsplit
 
+import yaml
 from bs4 import BeautifulSoup
-
-# Add future cleanup rules here.
+from fingerprint_assets import ASSET_TAGS, FINGERPRINTED_NAME_RE, fingerprint_reference
+from gremlins import GREMLIN_CHARS, GREMLIN_FIXES, gremlin_range
+from post_render_profile import add_profile_arguments, print_report, span, write_trace
+from post_render_pipeline import (
+    DEFAULT_CACHE_PATH,
+    STAGES,
+    PipelineContext,
+    load_cache,
+    process_file,
+    register_stage,
+    run_pipeline,
+    save_cache,
+)
+
+# Add future cleanup rules here; gremlin fixes go in gremlins.GREMLIN_FIXES.
 REPLACEMENTS: list[tuple[str, str]] = [
-    # ('const icon = "";', 'const icon = "😎";'),
-    ("", "😎"),
+    # ('const icon = "\ue9cb";', 'const icon = "\U0001f60e";'),
+    *GREMLIN_FIXES.items(),
     ('alt=""', 'alt="image"'),
 ]
 
+# Every source string compiled into one alternation, longest first so that a
+# rule whose source contains another one wins, then a single class of every
+# gremlin character: the gremlins that no rule fixes are counted in the same
+# pass, and only the hits are sorted by range.
+REPLACEMENT_INDEX: dict[str, int] = {
+    source: index for index, (source, _) in reversed(list(enumerate(REPLACEMENTS)))
+}
+REPLACEMENTS_RE = re.compile(
+    "|".join(
+        [re.escape(source) for source in sorted(REPLACEMENT_INDEX, key=len, reverse=True)]
+        + [f"(?P<gremlin>{GREMLIN_CHARS})"]
+    )
+)
+
 # Limit processing to text-oriented files.
 ALLOWED_SUFFIXES = {".html", ".js", ".css", ".xml", ".txt"}
 ALT_CHOICES = [
     "image",
 ]
+# "bs4" rebuilds the whole DOM with html5lib; "stream" only rewrites the
+# affected start tags and copies everything else through unchanged.
+ENGINES = ("bs4", "stream")
+SERIALIZERS = {"bs4": "bs4+html5lib", "stream": "stream"}
+OPTIONAL_SCRIPT_TYPES = {"text/javascript", "application/javascript"}
+# Read for website.site-url, which tells internal links from external ones.
+QUARTO_CONFIG = Path("_quarto.yml")
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+}
+# Elements whose content html5lib reads as text up to their end tag, like
+# script and style (which HTMLParser already handles); tags in there are
+# not edited.
+RAW_TEXT_ELEMENTS = {"title", "textarea", "xmp", "iframe", "noembed", "noframes"}
+# Elements that can be closed implicitly; removing one needs a real DOM.
+OPTIONAL_END_TAG_ELEMENTS = {
+    "p", "li", "dt", "dd", "rb", "rt", "rtc", "rp", "optgroup", "option",
+    "thead", "tbody", "tfoot", "tr", "td", "th", "colgroup", "caption",
+    "html", "head", "body",
+}
+
+
+def apply_replacements(content: str) -> tuple[str, dict[int, int], dict[str, int]]:
+    """Apply every REPLACEMENTS rule in one pass.
+
+    Returns the updated text, the number of hits per rule index and the
+    number of gremlins left per gremlins.GREMLIN_RANGES name.
+    """
+    rule_hits: dict[int, int] = {}
+    gremlins: dict[str, int] = {}
+
+    def repl(match: re.Match[str]) -> str:
+        if match.lastgroup is not None:
+            name = gremlin_range(match.group(0), match.start())
+            if name is not None:
+                gremlins[name] = gremlins.get(name, 0) + 1
+            return match.group(0)
+        index = REPLACEMENT_INDEX[match.group(0)]
+        rule_hits[index] = rule_hits.get(index, 0) + 1
+        return REPLACEMENTS[index][1]
+
+    return REPLACEMENTS_RE.sub(repl, content), rule_hits, gremlins
 
 
 def iter_target_files(paths: list[Path]) -> Iterable[Path]:
@@ -39,7 +122,12 @@ def iter_target_files(paths: list[Path]) -> Iterable[Path]:
 
         if path.is_dir():
             for file_path in path.rglob("*"):
-                if file_path.is_file() and file_path.suffix.lower() in ALLOWED_SUFFIXES:
+                if (
+                    file_path.is_file()
+                    and file_path.suffix.lower() in ALLOWED_SUFFIXES
+                    # Fingerprinted copies are immutable; their asset is processed.
+                    and not FINGERPRINTED_NAME_RE.search(file_path.name)
+                ):
                     yield file_path
 
 
@@ -54,7 +142,6 @@ def add_random_alt_to_images(soup: BeautifulSoup) -> int:
 
 def remove_optional_html5_attributes(soup: BeautifulSoup) -> int:
     removed = 0
-    optional_script_types = {"text/javascript", "application/javascript"}
 
     for tag in soup.find_all(attrs={"append-hash": True}):
         del tag["append-hash"]
@@ -62,7 +149,7 @@ def remove_optional_html5_attributes(soup: BeautifulSoup) -> int:
 
     for script in soup.find_all("script"):
         script_type = script.get("type", "").strip().lower()
-        if script_type in optional_script_types:
+        if script_type in OPTIONAL_SCRIPT_TYPES:
             del script["type"]
             removed += 1
 
@@ -82,6 +169,80 @@ def remove_optional_html5_attributes(soup: BeautifulSoup) -> int:
     return removed
 
 
+def load_site_host(config_path: Path = QUARTO_CONFIG) -> str:
+    """Return the host of website.site-url without "www.", or "" if unset."""
+    try:
+        config = yaml.safe_load(config_path.read_text(encoding="utf-8")) or {}
+        site_url = config.get("website", {}).get("site-url", "")
+    except (OSError, yaml.YAMLError, AttributeError):
+        return ""
+    return (urlsplit(str(site_url)).hostname or "").removeprefix("www.")
+
+
+def is_external_link(href: str, site_host: str) -> bool:
+    """Same rule as targetBlank() in scripts.js, with site-url as the site."""
+    href = href.strip()
+    if href.lower().startswith("mailto:"):
+        return True
+    try:
+        host = urlsplit(href).hostname
+    except ValueError:
+        return False
+    if not host:
+        return False
+    host = host.removeprefix("www.")
+    return host != site_host and not host.endswith("." + site_host)
+
+
+def external_link_attributes(
+    attrs: dict[str, str], site_host: str
+) -> dict[str, str] | None:
+    """Return the target/rel values an <a> needs, or None if it has them."""
+    if not site_host or "href" not in attrs or not is_external_link(attrs["href"], site_host):
+        return None
+    rel = attrs.get("rel", "").split()
+    if attrs.get("target") == "_blank" and "noopener" in rel:
+        return None
+    if "noopener" not in rel:
+        rel.append("noopener")
+    return {"target": "_blank", "rel": " ".join(rel)}
+
+
+def mark_external_links(soup: BeautifulSoup, site_host: str) -> int:
+    """Open external links in a new tab, as scripts.js did on each page load."""
+    marked = 0
+    for link in soup.find_all("a", href=True):
+        rel = link.get("rel", [])
+        attrs = {"href": link["href"], "rel": " ".join(rel), "target": link.get("target", "")}
+        needed = external_link_attributes(attrs, site_host)
+        if needed is None:
+            continue
+        link["target"] = needed["target"]
+        link["rel"] = needed["rel"].split()
+        marked += 1
+    return marked
+
+
+def fingerprint_asset_references(
+    soup: BeautifulSoup,
+    file_path: Path,
+    asset_index: dict[str, str],
+    write_copies: bool = True,
+) -> int:
+    """Point append-hash assets at their fingerprinted copy, before the
+    attribute is removed."""
+    rewritten = 0
+    for tag in soup.find_all(lambda tag: tag.name in ASSET_TAGS or tag.has_attr("append-hash")):
+        reference = fingerprint_reference(
+            tag.name, tag.attrs, file_path, asset_index, write_copies=write_copies
+        )
+        if reference is not None:
+            attribute, url = reference
+            tag[attribute] = url
+            rewritten += 1
+    return rewritten
+
+
 def remove_home_listing_descriptions(soup: BeautifulSoup, file_path: Path) -> int:
     if file_path.as_posix() != "_site/index.html":
         return 0
@@ -94,40 +255,332 @@ def remove_home_listing_descriptions(soup: BeautifulSoup, file_path: Path) -> in
     return removed
 
 
-def apply_cleanup(file_path: Path) -> tuple[int, int, int, int, bool]:
-    content = file_path.read_text(encoding="utf-8")
-    updated = content
-    replacements_count = 0
-    alts_added = 0
-    optional_attrs_removed = 0
-    home_listing_descriptions_removed = 0
+START_TAG_ATTR_RE = re.compile(
+    r"""(\s+)([^\s"'>/=]+)(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+))?"""
+)
+
+
+def optional_attributes_to_remove(tag: str, attrs: dict[str, str]) -> set[str]:
+    """Stream-engine twin of remove_optional_html5_attributes for one tag."""
+    removals = set()
+    if "append-hash" in attrs:
+        removals.add("append-hash")
+    tag_type = attrs.get("type", "").strip().lower()
+    if tag == "script" and tag_type in OPTIONAL_SCRIPT_TYPES:
+        removals.add("type")
+    elif tag == "style" and tag_type == "text/css":
+        removals.add("type")
+    elif tag == "link" and tag_type == "text/css":
+        if "stylesheet" in attrs.get("rel", "").lower().split():
+            removals.add("type")
+    return removals
+
+
+def rewrite_start_tag(
+    raw: str,
+    removals: set[str],
+    alt: str | None,
+    appended: dict[str, str] | None = None,
+) -> str:
+    """Drop attributes from a raw start tag and optionally insert an alt.
+
+    appended attributes replace any existing ones and go last in the tag.
+    """
+    name_end = re.match(r"<[^\s/>]+", raw).end()
+    if appended:
+        removals = removals | set(appended)
+    attributes = START_TAG_ATTR_RE.sub(
+        lambda m: "" if m.group(2).lower() in removals else m.group(0),
+        raw[name_end:],
+    )
+    if alt is not None:
+        attributes = f' alt="{escape(alt)}"' + attributes
+    if appended:
+        # Insert after the last attribute: a "/" there may end an unquoted value.
+        body_end = max((m.end() for m in START_TAG_ATTR_RE.finditer(attributes)), default=0)
+        extra = "".join(f' {key}="{escape(value)}"' for key, value in appended.items())
+        attributes = attributes[:body_end] + extra + attributes[body_end:].lstrip()
+    return raw[:name_end] + attributes
+
+
+class StreamCleanupParser(HTMLParser):
+    """Single-pass tag scanner recording edits as (start, end, text) spans.
+
+    Only start tags that need a change (and removed listing descriptions) are
+    recorded; the caller splices them into the original text. needs_dom is
+    set when an element to remove has no reliable end tag, or when the rest
+    of the page is text (<plaintext>).
+    """
+
+    def __init__(
+        self,
+        content: str,
+        file_path: Path,
+        site_host: str = "",
+        asset_index: dict[str, str] | None = None,
+        write_copies: bool = True,
+    ) -> None:
+        super().__init__(convert_charrefs=False)
+        self.content = content
+        self.file_path = file_path
+        self.remove_listing_descriptions = file_path.as_posix() == "_site/index.html"
+        self.site_host = site_host
+        self.asset_index = asset_index or {}
+        self.write_copies = write_copies
+        self.line_offsets = [0] + [m.end() for m in re.finditer("\n", content)]
+        self.edits: list[tuple[int, int, str]] = []
+        self.alts_added = 0
+        self.optional_attrs_removed = 0
+        self.home_listing_descriptions_removed = 0
+        self.external_links_marked = 0
+        self.assets_fingerprinted = 0
+        self.skip_tag: str | None = None
+        self.skip_depth = 0
+        self.skip_start = 0
+        self.needs_dom = False
+
+    def source_offset(self) -> int:
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in RAW_TEXT_ELEMENTS:
+            # Hand their content to handle_data, as HTMLParser does for <script>.
+            self.set_cdata_mode(tag)
+        elif tag == "plaintext":
+            self.needs_dom = True
+        if self.skip_tag is not None:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            return
+
+        raw = self.get_starttag_text() or ""
+        start = self.source_offset()
+        attr_map: dict[str, str] = {}
+        for key, value in attrs:
+            # html5lib keeps the first of duplicated attributes.
+            attr_map.setdefault(key, value or "")
+
+        if (
+            self.remove_listing_descriptions
+            and "listing-description" in attr_map.get("class", "").split()
+        ):
+            if tag in VOID_ELEMENTS:
+                self.edits.append((start, start + len(raw), ""))
+                self.home_listing_descriptions_removed += 1
+            elif tag in OPTIONAL_END_TAG_ELEMENTS:
+                self.needs_dom = True
+            else:
+                self.skip_tag, self.skip_depth, self.skip_start = tag, 1, start
+            return
+
+        removals = optional_attributes_to_remove(tag, attr_map)
+        alt = random.choice(ALT_CHOICES) if tag == "img" and "alt" not in attr_map else None
+        link_attrs = external_link_attributes(attr_map, self.site_host) if tag == "a" else None
+        reference = fingerprint_reference(
+            tag, attr_map, self.file_path, self.asset_index, write_copies=self.write_copies
+        )
+        appended = dict(link_attrs or {})
+        if reference is not None:
+            appended[reference[0]] = reference[1]
+        if removals or alt is not None or appended:
+            self.edits.append(
+                (start, start + len(raw), rewrite_start_tag(raw, removals, alt, appended))
+            )
+            self.optional_attrs_removed += len(removals)
+            self.alts_added += alt is not None
+            self.external_links_marked += link_attrs is not None
+            self.assets_fingerprinted += reference is not None
+
+    # The self-closing flag is ignored in HTML, so treat <x/> as <x>.
+    handle_startendtag = handle_starttag
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.skip_tag != tag:
+            return
+        self.skip_depth -= 1
+        if self.skip_depth == 0:
+            end = self.content.find(">", self.source_offset()) + 1 or len(self.content)
+            self.edits.append((self.skip_start, end, ""))
+            self.home_listing_descriptions_removed += 1
+            self.skip_tag = None
+
+
+def stream_cleanup(
+    content: str,
+    file_path: Path,
+    site_host: str = "",
+    asset_index: dict[str, str] | None = None,
+    write_copies: bool = True,
+) -> tuple[str, int, int, int, int, int] | None:
+    """Apply the HTML tag-level cleanups without building a DOM.
+
+    Returns (updated, alts_added, optional_attrs_removed,
+    home_listing_descriptions_removed, external_links_marked,
+    assets_fingerprinted), or None when the page needs the bs4 engine.
+    """
+    parser = StreamCleanupParser(content, file_path, site_host, asset_index, write_copies)
+    parser.feed(content)
+    parser.close()
+    if parser.needs_dom or parser.skip_tag is not None:
+        return None
+
+    pieces = []
+    position = 0
+    for start, end, text in parser.edits:
+        pieces.append(content[position:start])
+        pieces.append(text)
+        position = end
+    pieces.append(content[position:])
+    return (
+        "".join(pieces),
+        parser.alts_added,
+        parser.optional_attrs_removed,
+        parser.home_listing_descriptions_removed,
+        parser.external_links_marked,
+        parser.assets_fingerprinted,
+    )
 
-    for source, target in REPLACEMENTS:
-        occurrences = updated.count(source)
-        if occurrences:
-            updated = updated.replace(source, target)
-            replacements_count += occurrences
 
-    if file_path.suffix.lower() == ".html":
-        soup = BeautifulSoup(updated, "html5lib")
+def html_cleanup(
+    content: str,
+    file_path: Path,
+    engine: str = "bs4",
+    site_host: str = "",
+    asset_index: dict[str, str] | None = None,
+    write_copies: bool = True,
+) -> tuple[str, int, int, int, int, int]:
+    """Apply the HTML cleanups with the given engine.
+
+    Returns (updated, alts_added, optional_attrs_removed,
+    home_listing_descriptions_removed, external_links_marked,
+    assets_fingerprinted). External links are only marked when site_host is
+    given, and assets only fingerprinted with an asset_index; without
+    write_copies, their fingerprinted copies are not written.
+    """
+    if engine == "stream":
+        with span("stream_scan"):
+            streamed = stream_cleanup(
+                content, file_path, site_host, asset_index, write_copies
+            )
+        if streamed is not None:
+            return streamed
+
+    with span("html5lib_parse"):
+        soup = BeautifulSoup(content, "html5lib")
+    with span("soup_transforms"):
         home_listing_descriptions_removed = remove_home_listing_descriptions(soup, file_path)
         alts_added = add_random_alt_to_images(soup)
+        assets_fingerprinted = (
+            fingerprint_asset_references(soup, file_path, asset_index, write_copies)
+            if asset_index
+            else 0
+        )
         optional_attrs_removed = remove_optional_html5_attributes(soup)
+        external_links_marked = mark_external_links(soup, site_host) if site_host else 0
+    with span("serialize"):
         updated = soup.decode(formatter="html5")
+    return (
+        updated,
+        alts_added,
+        optional_attrs_removed,
+        home_listing_descriptions_removed,
+        external_links_marked,
+        assets_fingerprinted,
+    )
 
-    changed = updated != content
-    if updated != content:
-        try:
-            file_path.write_text(updated, encoding="utf-8")
-        except FileNotFoundError:
-            # Some files can disappear during post-render moves; skip safely.
-            changed = False
 
-    return (
-        replacements_count,
+@register_stage("replacements")
+def replacements_stage(
+    content: str, file_path: Path, context: PipelineContext
+) -> tuple[str, dict[str, int]]:
+    updated, rule_hits, gremlins = apply_replacements(content)
+    counters = {f"rule_{index}": hits for index, hits in rule_hits.items()}
+    counters["replacements"] = sum(rule_hits.values())
+    if gremlins:
+        counters["gremlins"] = sum(gremlins.values())
+    return updated, counters
+
+
+@register_stage("html_cleanup")
+def html_cleanup_stage(
+    content: str, file_path: Path, context: PipelineContext
+) -> tuple[str, dict[str, int]]:
+    if file_path.suffix.lower() != ".html":
+        return content, {}
+    (
+        updated,
         alts_added,
         optional_attrs_removed,
         home_listing_descriptions_removed,
+        external_links_marked,
+        assets_fingerprinted,
+    ) = html_cleanup(
+        content,
+        file_path,
+        context.engine,
+        context.site_host,
+        context.asset_index,
+        context.write_copies,
+    )
+    return updated, {
+        "alt_added": alts_added,
+        "optional_attrs_removed": optional_attrs_removed,
+        "home_listing_descriptions_removed": home_listing_descriptions_removed,
+        "external_links_marked": external_links_marked,
+        "assets_fingerprinted": assets_fingerprinted,
+    }
+
+
+# Stages run by this script, in order.
+CLEANUP_STAGES = ("replacements", "html_cleanup")
+
+
+def rules_fingerprint(engine: str = "bs4", site_host: str = "") -> str:
+    """Hash of the rule set; any change to it invalidates the cache."""
+    parts = [
+        engine,
+        site_host,
+        repr(REPLACEMENTS),
+        GREMLIN_CHARS,
+        repr(ALT_CHOICES),
+        repr(sorted(ALLOWED_SUFFIXES)),
+    ]
+    parts += [
+        inspect.getsource(func)
+        for func in (
+            replacements_stage,
+            html_cleanup_stage,
+            apply_replacements,
+            html_cleanup,
+            remove_home_listing_descriptions,
+            add_random_alt_to_images,
+            remove_optional_html5_attributes,
+            is_external_link,
+            external_link_attributes,
+            mark_external_links,
+            fingerprint_asset_references,
+            fingerprint_reference,
+            stream_cleanup,
+            StreamCleanupParser,
+            optional_attributes_to_remove,
+            rewrite_start_tag,
+        )
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def apply_cleanup(file_path: Path, site_host: str = "") -> tuple[int, int, int, int, int, bool]:
+    stages = tuple(STAGES[name] for name in CLEANUP_STAGES)
+    context = PipelineContext(site_host=site_host)
+    counters, changed, _, _ = process_file(file_path, stages=stages, context=context)
+    assert counters is not None
+    return (
+        counters.get("replacements", 0),
+        counters.get("alt_added", 0),
+        counters.get("optional_attrs_removed", 0),
+        counters.get("home_listing_descriptions_removed", 0),
+        counters.get("external_links_marked", 0),
         changed,
     )
 
@@ -142,6 +595,32 @@ def main() -> int:
         default=["_site"],
         help="Files or directories to process (default: _site).",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count, 1 = serial).",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="bs4",
+        help="HTML engine: bs4 (full html5lib re-serialization, default) or "
+        "stream (rewrite affected start tags only).",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=DEFAULT_CACHE_PATH,
+        help=f"Content-hash cache file (default: {DEFAULT_CACHE_PATH}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Process every file, ignoring and not updating the cache.",
+    )
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
     targets = [Path(p) for p in args.paths]
@@ -150,21 +629,47 @@ def main() -> int:
     total_alts_added = 0
     total_optional_attrs_removed = 0
     total_home_listing_descriptions_removed = 0
-
-    for file_path in iter_target_files(targets):
-        (
-            replacements_count,
-            alts_added,
-            optional_attrs_removed,
-            home_listing_descriptions_removed,
-            changed,
-        ) = apply_cleanup(
-            file_path
+    total_external_links_marked = 0
+    total_gremlins = 0
+
+    files_skipped = 0
+    total_rule_hits = [0] * len(REPLACEMENTS)
+
+    site_host = load_site_host()
+    fingerprint = rules_fingerprint(args.engine, site_host)
+    cache = {} if args.no_cache else load_cache(args.cache, fingerprint)
+    context = PipelineContext(engine=args.engine, site_host=site_host)
+
+    files = list(iter_target_files(targets))
+    profiles = []
+    results = run_pipeline(files, CLEANUP_STAGES, context, args.jobs, cache, args.profile)
+    for file_path, counters, changed, digest, profile in results:
+        if digest is None:
+            cache.pop(file_path.as_posix(), None)
+        else:
+            cache[file_path.as_posix()] = digest
+        if profile:
+            profiles.append(profile)
+        if counters is None:
+            files_skipped += 1
+            continue
+        replacements_count = counters.get("replacements", 0)
+        alts_added = counters.get("alt_added", 0)
+        optional_attrs_removed = counters.get("optional_attrs_removed", 0)
+        home_listing_descriptions_removed = counters.get(
+            "home_listing_descriptions_removed", 0
         )
+        external_links_marked = counters.get("external_links_marked", 0)
+        for index in range(len(REPLACEMENTS)):
+            total_rule_hits[index] += counters.get(f"rule_{index}", 0)
         total_replacements += replacements_count
         total_alts_added += alts_added
         total_optional_attrs_removed += optional_attrs_removed
         total_home_listing_descriptions_removed += home_listing_descriptions_removed
+        total_external_links_marked += external_links_marked
+        if counters.get("gremlins"):
+            total_gremlins += counters["gremlins"]
+            print(f"gremlins: {file_path} ({counters['gremlins']} left)")
 
         if changed:
             files_changed += 1
@@ -174,7 +679,8 @@ def main() -> int:
                 f"(replacements={replacements_count}, alt_added={alts_added}, "
                 f"optional_attrs_removed={optional_attrs_removed}, "
                 f"home_listing_descriptions_removed={home_listing_descriptions_removed}, "
-                "serialize=bs4+html5lib)"
+                f"external_links_marked={external_links_marked}, "
+                f"serialize={SERIALIZERS[args.engine]})"
             )
 
     print(
@@ -182,9 +688,21 @@ def main() -> int:
         f"{total_replacements} replacement(s), "
         f"{total_alts_added} alt attribute(s) added, "
         f"{total_optional_attrs_removed} optional attribute(s) removed, "
-        f"{total_home_listing_descriptions_removed} home listing description(s) removed "
+        f"{total_home_listing_descriptions_removed} home listing description(s) removed, "
+        f"{total_external_links_marked} external link(s) marked "
         f"across {files_changed} file(s)"
     )
+    for (source, target), hits in zip(REPLACEMENTS, total_rule_hits):
+        print(f"  rule {source!r} -> {target!r}: {hits} hit(s)")
+    if total_gremlins:
+        print(f"  {total_gremlins} gremlin(s) left, see python3 _scripts/gremlins.py _site")
+    if not args.no_cache:
+        save_cache(args.cache, fingerprint, cache)
+        print(f"cleanup cache: {files_skipped} unchanged file(s) skipped")
+    if args.profile:
+        print_report(profiles, args.profile_top)
+        if args.profile_trace:
+            write_trace(profiles, args.profile_trace)
     return 0
 
 
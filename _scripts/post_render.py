@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+"""
+Post-render pipeline entry point.
+
+Runs the prev/next link injection, the REPLACEMENTS rules and the HTML
+cleanups on each file of _site with a single read and a single write.
+create_prev_next_buttons.py and post_process_cleanup.py still work on their
+own for running one step at a time.
+
+With --watch, the script stays alive after the first pass (parsers and post
+index warm) and processes only the files Quarto writes during preview. While
+POST_RENDER_WATCH is set in the environment, normal runs hand the files
+Quarto wrote to the daemon and wait until it processed them (see _serve.sh),
+so that the preview only reloads cleaned-up pages; without a daemon, they
+process the files themselves.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import os
+import signal
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Iterable
+
+from create_prev_next_buttons import (
+    build_nav_links,
+    get_changed_nav_pages,
+    get_post_names,
+    load_nav_state,
+    prev_next_stage,
+    save_nav_state,
+)
+from fingerprint_assets import (
+    FINGERPRINTED_NAME_RE,
+    build_asset_index,
+    load_manifest,
+    manifest_outdated,
+    write_manifest,
+)
+from post_process_cleanup import (
+    ALLOWED_SUFFIXES,
+    ENGINES,
+    REPLACEMENTS,
+    iter_target_files,
+    load_site_host,
+    rules_fingerprint,
+)
+from post_render_pipeline import (
+    PipelineContext,
+    load_cache,
+    run_pipeline,
+    save_cache,
+)
+from post_render_profile import add_profile_arguments, print_report, write_trace
+from post_render_watch import SyncServer, make_watcher, request_sync
+
+WATCH_ENV_VAR = "POST_RENDER_WATCH"
+# Not post_process_cleanup.py's cache: the fingerprints differ, and running
+# one script would otherwise invalidate the cache of the other.
+DEFAULT_CACHE_PATH = Path(".quarto/post-render-cache.json")
+# Stages run on every file, in order.
+STAGE_ORDER = ("prev_next", "replacements", "html_cleanup")
+SUMMARY_COUNTERS = (
+    "prev_next_updated",
+    "replacements",
+    "alt_added",
+    "optional_attrs_removed",
+    "home_listing_descriptions_removed",
+    "external_links_marked",
+    "assets_fingerprinted",
+)
+
+
+def pipeline_fingerprint(engine: str, site_host: str) -> str:
+    parts = [
+        ",".join(STAGE_ORDER),
+        rules_fingerprint(engine, site_host),
+        inspect.getsource(prev_next_stage),
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def format_counters(counters: dict[str, int]) -> str:
+    return ", ".join(f"{key}={counters.get(key, 0)}" for key in SUMMARY_COUNTERS)
+
+
+def run_assets_then_pages(
+    files: list[Path],
+    context: PipelineContext,
+    jobs: int,
+    cache: dict[str, str],
+    profile: bool,
+    asset_index: dict[str, str],
+) -> Iterable[tuple[Path, dict[str, int] | None, bool, str | None, dict | None]]:
+    """run_pipeline on the other files first, then on the HTML pages.
+
+    The stages also rewrite .css/.js files, so the asset index is only built
+    once they are final: a fingerprinted copy then holds the very bytes its
+    name was hashed from. asset_index is filled with the index the pages
+    are processed with. When an asset of the previous manifest changed, the
+    pages are processed even if cached, to point at the new copy.
+    """
+    assets = [path for path in files if path.suffix.lower() != ".html"]
+    pages = [path for path in files if path.suffix.lower() == ".html"]
+    yield from run_pipeline(assets, STAGE_ORDER, context, jobs, cache, profile)
+
+    asset_index.clear()
+    asset_index.update(build_asset_index())
+    context = replace(context, asset_index=dict(asset_index))
+    if manifest_outdated(load_manifest(), asset_index):
+        cache = None
+    yield from run_pipeline(pages, STAGE_ORDER, context, jobs, cache, profile)
+
+
+def process_files(
+    files: list[Path],
+    args: argparse.Namespace,
+    cache: dict[str, str],
+    force_nav_pages: bool = False,
+    profiles: list[dict] | None = None,
+) -> tuple[dict[str, int], list[Path], int]:
+    """Run the pipeline on files and return (totals, changed files, skipped).
+
+    With args.profile, the per-file profile records are appended to profiles.
+
+    Pages whose prev/next targets moved since the previous run are relinked
+    even if their content did not change; with force_nav_pages they are added
+    to files when missing from it.
+    """
+    nav_links = build_nav_links(get_post_names())
+    context = PipelineContext(
+        engine=args.engine, site_host=args.site_host, nav_links=nav_links
+    )
+    changed_nav_pages = get_changed_nav_pages(nav_links, load_nav_state(), check_mtimes=False)
+    for page_path in changed_nav_pages:
+        cache.pop(page_path, None)
+    if force_nav_pages:
+        known = {file_path.as_posix() for file_path in files}
+        files = files + [
+            Path(page_path)
+            for page_path in sorted(changed_nav_pages - known)
+            if os.path.isfile(page_path)
+        ]
+
+    totals: dict[str, int] = {}
+    changed_files = []
+    files_skipped = 0
+    results = run_assets_then_pages(
+        files, context, args.jobs, cache, args.profile, args.asset_index
+    )
+    for file_path, counters, changed, digest, profile in results:
+        if digest is None:
+            cache.pop(file_path.as_posix(), None)
+        else:
+            cache[file_path.as_posix()] = digest
+        if profile is not None and profiles is not None:
+            profiles.append(profile)
+        if counters is None:
+            files_skipped += 1
+            continue
+        for key, value in counters.items():
+            totals[key] = totals.get(key, 0) + value
+        if changed:
+            changed_files.append(file_path)
+            print(f"updated: {file_path} ({format_counters(counters)})")
+        if counters.get("gremlins"):
+            print(f"gremlins: {file_path} ({counters['gremlins']} left)")
+
+    save_nav_state(nav_links)
+    return totals, changed_files, files_skipped
+
+
+def watch(
+    args: argparse.Namespace,
+    cache: dict[str, str],
+    fingerprint: str,
+    sync_server: SyncServer,
+) -> int:
+    """Process files as soon as Quarto writes them, until interrupted.
+
+    A sync request from the post-render step processes the files written so
+    far at once, with the files it lists, and is answered when they are done.
+    """
+    # Relative paths, as reported by the watchers.
+    targets = [Path(os.path.relpath(p)) for p in args.paths]
+    directories = [path for path in targets if path.is_dir()]
+    files = {path for path in targets if not path.is_dir()}
+
+    def accept(path: Path) -> bool:
+        return (
+            path.suffix.lower() in ALLOWED_SUFFIXES
+            and not FINGERPRINTED_NAME_RE.search(path.name)
+            and (path in files or any(path.is_relative_to(d) for d in directories))
+        )
+
+    watcher = make_watcher(
+        targets,
+        list_files=lambda: iter_target_files(targets),
+        accept=accept,
+        interval=args.interval,
+        force_polling=args.poll,
+    )
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # _serve.sh stops the daemon with SIGTERM; remove the socket then too.
+    signal.signal(signal.SIGTERM, stop)
+    watched = ", ".join(str(path) for path in targets)
+    print(f"post-render watch: watching {watched} ({type(watcher).__name__}), Ctrl+C to stop")
+    try:
+        while True:
+            changed = watcher.wait(sync_server.wake)
+            requests = sync_server.take()
+            for _, paths in requests:
+                changed |= {
+                    path
+                    for path in (Path(os.path.relpath(p)) for p in paths)
+                    if accept(path) and path.is_file()
+                }
+            if changed:
+                batch = sorted(changed)
+                started = time.perf_counter()
+                totals, changed_files, _ = process_files(
+                    batch, args, cache, force_nav_pages=True
+                )
+                watcher.forget(changed_files)
+                if not args.no_cache:
+                    save_cache(args.cache, fingerprint, cache)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                print(
+                    f"post-render watch: {len(batch)} file(s) written, "
+                    f"{len(changed_files)} updated in {elapsed_ms:.0f} ms "
+                    f"({format_counters(totals)})"
+                )
+            sync_server.done(requests)
+    except KeyboardInterrupt:
+        print("post-render watch: stopped")
+    finally:
+        sync_server.stop()
+        watcher.stop()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run every post-render stage.")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["_site"],
+        help="Files or directories to process (default: _site).",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count, 1 = serial).",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="bs4",
+        help="HTML cleanup engine (default: bs4).",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=DEFAULT_CACHE_PATH,
+        help=f"Content-hash cache file (default: {DEFAULT_CACHE_PATH}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Process every file, ignoring and not updating the cache.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and process files as soon as they are written.",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="With --watch, poll mtimes even if watchdog is installed.",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="With --watch --poll, seconds between two scans (default: 0.5).",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if os.environ.get(WATCH_ENV_VAR) and not args.watch:
+        # Set by Quarto for post-render scripts, one path per line.
+        outputs = os.environ.get("QUARTO_PROJECT_OUTPUT_FILES", "").splitlines()
+        if request_sync(outputs):
+            print("post-render: files processed by the --watch daemon")
+            return 0
+        print("post-render: no --watch daemon answered, processing the files here")
+    # Listening before the first pass: the post-render steps of the renders
+    # that end meanwhile wait for it instead of processing the files twice.
+    sync_server = SyncServer() if args.watch else None
+
+    # Read once; the watch daemon keeps it for the whole session.
+    args.site_host = load_site_host()
+    # Filled by each run, once the assets are processed.
+    args.asset_index = {}
+    fingerprint = pipeline_fingerprint(args.engine, args.site_host)
+    cache = {} if args.no_cache else load_cache(args.cache, fingerprint)
+
+    files = list(iter_target_files([Path(p) for p in args.paths]))
+    profiles: list[dict] = []
+    totals, changed_files, files_skipped = process_files(files, args, cache, profiles=profiles)
+
+    print(f"post-render done: {format_counters(totals)} across {len(changed_files)} file(s)")
+    for index, (source, target) in enumerate(REPLACEMENTS):
+        print(f"  rule {source!r} -> {target!r}: {totals.get(f'rule_{index}', 0)} hit(s)")
+    if totals.get("gremlins"):
+        print(f"  {totals['gremlins']} gremlin(s) left, see python3 _scripts/gremlins.py _site")
+    manifest, stale_copies = write_manifest(args.asset_index)
+    if manifest or stale_copies:
+        print(
+            f"  asset manifest: {len(manifest)} fingerprinted asset(s), "
+            f"{len(stale_copies)} stale file(s) removed"
+        )
+    if not args.no_cache:
+        save_cache(args.cache, fingerprint, cache)
+        print(f"post-render cache: {files_skipped} unchanged file(s) skipped")
+    if args.profile:
+        print_report(profiles, args.profile_top)
+        if args.profile_trace:
+            write_trace(profiles, args.profile_trace)
+            print(f"profile trace: {args.profile_trace}")
+
+    if args.watch:
+        # In watch mode a single worker answers faster than a cold pool.
+        args.jobs = 1
+        args.profile = False
+        return watch(args, cache, fingerprint, sync_server)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
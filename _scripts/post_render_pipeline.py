@@ -0,0 +1,180 @@
+"""
+Post-render pipeline core.
+
+Per-file stages (prev/next links, REPLACEMENTS rules, HTML cleanups) are
+registered here by the modules that define them and run on each file of
+_site with a single read and a single write. Also holds the shared process
+pool runner and the content-hash cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable
+
+from post_render_profile import add_bytes, is_active, profile_file, span
+
+# Digest of each file after the pipeline, used to skip files already processed.
+DEFAULT_CACHE_PATH = Path(".quarto/cleanup-cache.json")
+
+
+@dataclass(frozen=True)
+class PipelineContext:
+    """Read-only data shared by every stage during one run."""
+
+    engine: str = "bs4"
+    # Host of website.site-url; links to other hosts open in a new tab.
+    site_host: str = ""
+    # Asset path -> fingerprinted copy, relative to _site (see fingerprint_assets).
+    asset_index: dict[str, str] = field(default_factory=dict)
+    # "_site/..." path -> (prev_link, next_link)
+    nav_links: dict[str, tuple[str, str]] = field(default_factory=dict)
+    # False for dry runs: the fingerprinted copies of assets are not written.
+    write_copies: bool = True
+
+
+# A stage takes the current text and returns it updated, with its counters.
+Stage = Callable[[str, Path, PipelineContext], tuple[str, dict[str, int]]]
+STAGES: dict[str, Stage] = {}
+
+
+def register_stage(name: str) -> Callable[[Stage], Stage]:
+    def decorator(func: Stage) -> Stage:
+        STAGES[name] = func
+        return func
+
+    return decorator
+
+
+def content_digest(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def load_cache(cache_path: Path, fingerprint: str) -> dict[str, str]:
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("rules") != fingerprint:
+        return {}
+    files = data.get("files")
+    return files if isinstance(files, dict) else {}
+
+
+def save_cache(cache_path: Path, fingerprint: str, digests: dict[str, str]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    tmp_path.write_text(
+        json.dumps({"rules": fingerprint, "files": digests}, indent=2, sort_keys=True),
+        encoding="utf-8",
+    )
+    os.replace(tmp_path, cache_path)
+
+
+def stage_name(stage: Stage) -> str:
+    return stage.__name__.removesuffix("_stage")
+
+
+def run_stages(
+    content: str, file_path: Path, stages: tuple[Stage, ...], context: PipelineContext
+) -> tuple[str, dict[str, int]]:
+    """Run stages on the text of file_path; return it updated, with the counters."""
+    updated = content
+    counters: dict[str, int] = {}
+    for stage in stages:
+        with span(stage_name(stage)):
+            updated, stage_counters = stage(updated, file_path, context)
+        for key, value in stage_counters.items():
+            counters[key] = counters.get(key, 0) + value
+    return updated, counters
+
+
+def process_file(
+    file_path: Path,
+    cached_digest: str | None = None,
+    stages: tuple[Stage, ...] = (),
+    context: PipelineContext = PipelineContext(),
+    profile: bool = False,
+) -> tuple[dict[str, int] | None, bool, str | None, dict | None]:
+    """Run stages on one file and return (counters, changed, digest, profile).
+
+    When the current content digest equals cached_digest, the file is already
+    processed and is skipped without running any stage; counters are then None.
+    digest is None when the processed file could not be written back, so
+    that it is not cached. profile is the post_render_profile record of the
+    file, or None.
+    """
+    with profile_file(file_path.as_posix(), profile) as file_profile:
+        result = _process_file(file_path, cached_digest, stages, context)
+        return (*result, file_profile.record() if file_profile else None)
+
+
+def _process_file(
+    file_path: Path,
+    cached_digest: str | None,
+    stages: tuple[Stage, ...],
+    context: PipelineContext,
+) -> tuple[dict[str, int] | None, bool, str | None]:
+    with span("read"):
+        content = file_path.read_text(encoding="utf-8")
+    with span("digest"):
+        digest = content_digest(content)
+    if is_active():
+        add_bytes(read=len(content.encode("utf-8")))
+    if digest == cached_digest:
+        return None, False, digest
+
+    updated, counters = run_stages(content, file_path, stages, context)
+    changed = updated != content
+    if changed:
+        try:
+            with span("write"):
+                file_path.write_text(updated, encoding="utf-8")
+        except FileNotFoundError:
+            # Some files can disappear during post-render moves; skip safely,
+            # without caching the digest of the unprocessed content.
+            return counters, False, None
+        else:
+            digest = content_digest(updated)
+            if is_active():
+                add_bytes(written=len(updated.encode("utf-8")))
+
+    return counters, changed, digest
+
+
+def run_pipeline(
+    files: list[Path],
+    stage_names: Iterable[str],
+    context: PipelineContext = PipelineContext(),
+    jobs: int = 1,
+    cache: dict[str, str] | None = None,
+    profile: bool = False,
+) -> Iterable[tuple[Path, dict[str, int] | None, bool, str | None, dict | None]]:
+    """Yield (file_path, counters, changed, digest, profile) in input order.
+
+    With jobs > 1, files are spread across a process pool; results are still
+    yielded in the same order as a serial run so the output is identical.
+    Stage functions, not names, are sent to the workers so that the registry
+    does not need to be rebuilt in each process.
+    """
+    stages = tuple(STAGES[name] for name in stage_names)
+    worker = partial(process_file, stages=stages, context=context, profile=profile)
+    cache = cache or {}
+    digests = [cache.get(file_path.as_posix()) for file_path in files]
+    if jobs <= 1 or len(files) <= 1:
+        for file_path, cached_digest in zip(files, digests):
+            yield (file_path, *worker(file_path, cached_digest))
+        return
+
+    workers = min(jobs, len(files))
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(worker, files, digests, chunksize=chunksize)
+        for file_path, result in zip(files, results):
+            yield (file_path, *result)
@@ -0,0 +1,183 @@
+"""
+Lightweight profiling for the post-render scripts (--profile).
+
+Code wraps its steps in span("name"); spans are only recorded while a
+FileProfile is active in the current process, so they cost nothing
+otherwise. Records are plain dicts so that they can come back from the
+process pool, and can be written as a Chrome trace-event JSON file
+(chrome://tracing, https://ui.perfetto.dev).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+_active: FileProfile | None = None
+
+
+class FileProfile:
+    """Spans and byte counts recorded while processing one file."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.spans: list[tuple[str, int, int, int]] = []
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.start_ns = time.perf_counter_ns()
+        self.start_cpu_ns = time.process_time_ns()
+
+    def record(self) -> dict:
+        return {
+            "file": self.name,
+            "pid": os.getpid(),
+            "start_ns": self.start_ns,
+            "wall_ns": time.perf_counter_ns() - self.start_ns,
+            "cpu_ns": time.process_time_ns() - self.start_cpu_ns,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            # (name, start_ns, wall_ns, cpu_ns)
+            "spans": self.spans,
+        }
+
+
+@contextmanager
+def profile_file(name: str, enabled: bool = True) -> Iterator[FileProfile | None]:
+    """Activate a FileProfile for the duration of the block."""
+    global _active
+    if not enabled:
+        yield None
+        return
+    previous, _active = _active, FileProfile(name)
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    profile = _active
+    if profile is None:
+        yield
+        return
+    start_ns = time.perf_counter_ns()
+    start_cpu_ns = time.process_time_ns()
+    try:
+        yield
+    finally:
+        profile.spans.append(
+            (
+                name,
+                start_ns,
+                time.perf_counter_ns() - start_ns,
+                time.process_time_ns() - start_cpu_ns,
+            )
+        )
+
+
+def add_bytes(read: int = 0, written: int = 0) -> None:
+    if _active is not None:
+        _active.bytes_read += read
+        _active.bytes_written += written
+
+
+def is_active() -> bool:
+    return _active is not None
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record wall/CPU time per stage and per file, and bytes read/written.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="With --profile, number of slowest files to print (default: 10).",
+    )
+    parser.add_argument(
+        "--profile-trace",
+        type=Path,
+        help="With --profile, also write a Chrome trace-event JSON file.",
+    )
+
+
+def print_report(records: list[dict], top: int = 10) -> None:
+    """Print per-stage totals and the slowest files."""
+    stages: dict[str, list[int]] = {}
+    for record in records:
+        for name, _, wall_ns, cpu_ns in record["spans"]:
+            totals = stages.setdefault(name, [0, 0, 0])
+            totals[0] += wall_ns
+            totals[1] += cpu_ns
+            totals[2] += 1
+
+    wall_ns = sum(record["wall_ns"] for record in records)
+    cpu_ns = sum(record["cpu_ns"] for record in records)
+    bytes_read = sum(record["bytes_read"] for record in records)
+    bytes_written = sum(record["bytes_written"] for record in records)
+    print(
+        f"profile: {len(records)} file(s), wall={wall_ns / 1e6:.1f} ms, "
+        f"cpu={cpu_ns / 1e6:.1f} ms, read={bytes_read} B, written={bytes_written} B"
+    )
+    for name, (stage_wall_ns, stage_cpu_ns, calls) in sorted(
+        stages.items(), key=lambda item: item[1][0], reverse=True
+    ):
+        print(
+            f"  stage {name:<24} wall={stage_wall_ns / 1e6:9.1f} ms  "
+            f"cpu={stage_cpu_ns / 1e6:9.1f} ms  calls={calls}"
+        )
+    slowest = sorted(records, key=lambda record: record["wall_ns"], reverse=True)[:top]
+    for record in slowest:
+        print(
+            f"  slow  {record['wall_ns'] / 1e6:8.1f} ms  "
+            f"cpu={record['cpu_ns'] / 1e6:7.1f} ms  {record['file']}"
+        )
+
+
+def write_trace(records: list[dict], trace_path: Path) -> None:
+    """Write records in Chrome trace-event format (timestamps in µs)."""
+    origin_ns = min((record["start_ns"] for record in records), default=0)
+    events = []
+    for record in records:
+        events.append(
+            {
+                "name": record["file"],
+                "cat": "file",
+                "ph": "X",
+                "ts": (record["start_ns"] - origin_ns) / 1000,
+                "dur": record["wall_ns"] / 1000,
+                "pid": record["pid"],
+                "tid": record["pid"],
+                "args": {
+                    "cpu_us": record["cpu_ns"] / 1000,
+                    "bytes_read": record["bytes_read"],
+                    "bytes_written": record["bytes_written"],
+                },
+            }
+        )
+        for name, start_ns, wall_ns, cpu_ns in record["spans"]:
+            events.append(
+                {
+                    "name": name,
+                    "cat": "stage",
+                    "ph": "X",
+                    "ts": (start_ns - origin_ns) / 1000,
+                    "dur": wall_ns / 1000,
+                    "pid": record["pid"],
+                    "tid": record["pid"],
+                    "args": {"file": record["file"], "cpu_us": cpu_ns / 1000},
+                }
+            )
+    trace_path.parent.mkdir(parents=True, exist_ok=True)
+    trace_path.write_text(
+        json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8"
+    )
@@ -0,0 +1,269 @@
+"""
+File watchers for post_render.py --watch.
+
+NotifyWatcher relies on the optional watchdog package (inotify on Linux,
+FSEvents on macOS); PollingWatcher only needs the standard library and
+compares mtimes. Both return batches of changed files once writes settle.
+
+SyncServer lets the post-render step that Quarto runs after each render
+wait for the daemon: the step sends the files Quarto wrote over a Unix
+socket (request_sync) and blocks until the daemon has processed them, so
+that the browser only reloads once the pages are cleaned up.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+SYNC_SOCKET_PATH = Path(".quarto/post-render-watch.sock")
+SYNC_DONE = b"done\n"
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency, polling is used instead
+    Observer = None
+
+
+def sleep_or_wake(interval: float, wake: threading.Event | None) -> bool:
+    """Sleep for interval; return True if wake was set meanwhile."""
+    if wake is None:
+        time.sleep(interval)
+        return False
+    return wake.wait(interval)
+
+
+class PollingWatcher:
+    """Detect changed files by comparing mtimes between two scans."""
+
+    def __init__(
+        self,
+        list_files: Callable[[], Iterable[Path]],
+        interval: float = 0.5,
+    ) -> None:
+        self.list_files = list_files
+        self.interval = interval
+        self.mtimes = self.scan()
+
+    def scan(self) -> dict[Path, int]:
+        mtimes = {}
+        for file_path in self.list_files():
+            try:
+                mtimes[file_path] = file_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+        return mtimes
+
+    def poll(self) -> set[Path]:
+        current = self.scan()
+        changed = {path for path, mtime in current.items() if self.mtimes.get(path) != mtime}
+        self.mtimes = current
+        return changed
+
+    def wait(self, wake: threading.Event | None = None) -> set[Path]:
+        """Block until files changed, then until a scan shows no new change.
+
+        Returns the changes so far as soon as wake is set.
+        """
+        changed: set[Path] = set()
+        while not changed:
+            if sleep_or_wake(self.interval, wake):
+                return self.poll()
+            changed = self.poll()
+        while True:
+            if sleep_or_wake(self.interval, wake):
+                return changed | self.poll()
+            more = self.poll()
+            if not more:
+                return changed
+            changed |= more
+
+    def forget(self, paths: Iterable[Path]) -> None:
+        """Record our own writes so that they are not reported back."""
+        for path in paths:
+            try:
+                self.mtimes[path] = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                self.mtimes.pop(path, None)
+
+    def stop(self) -> None:
+        pass
+
+
+class NotifyWatcher:
+    """Collect file system events from watchdog in a background thread."""
+
+    def __init__(
+        self,
+        roots: list[Path],
+        accept: Callable[[Path], bool],
+        interval: float = 0.1,
+    ) -> None:
+        self.interval = interval
+        self.accept = accept
+        self.lock = threading.Lock()
+        self.pending: set[Path] = set()
+        self.ignored: dict[Path, int] = {}
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event) -> None:
+                if event.is_directory:
+                    return
+                for raw_path in (event.src_path, getattr(event, "dest_path", "")):
+                    if raw_path:
+                        watcher.add(Path(os.path.relpath(raw_path)))
+
+        self.observer = Observer()
+        handler = Handler()
+        scheduled = set()
+        for root in roots:
+            # A file target is watched through its directory; accept filters.
+            directory, recursive = (root, True) if root.is_dir() else (root.parent, False)
+            if (directory, recursive) not in scheduled:
+                scheduled.add((directory, recursive))
+                self.observer.schedule(handler, str(directory), recursive=recursive)
+        self.observer.start()
+
+    def add(self, path: Path) -> None:
+        if not self.accept(path):
+            return
+        with self.lock:
+            self.pending.add(path)
+
+    def take(self) -> set[Path]:
+        with self.lock:
+            changed, self.pending = self.pending, set()
+        result = set()
+        for path in changed:
+            try:
+                mtime = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if self.ignored.get(path) != mtime:
+                result.add(path)
+        return result
+
+    def wait(self, wake: threading.Event | None = None) -> set[Path]:
+        """Block until files changed, then until no new event arrives.
+
+        Returns the changes so far as soon as wake is set.
+        """
+        changed: set[Path] = set()
+        while not changed:
+            if sleep_or_wake(self.interval, wake):
+                return self.take()
+            changed = self.take()
+        while True:
+            if sleep_or_wake(self.interval, wake):
+                return changed | self.take()
+            more = self.take()
+            if not more:
+                return changed
+            changed |= more
+
+    def forget(self, paths: Iterable[Path]) -> None:
+        """Record our own writes so that they are not reported back."""
+        for path in paths:
+            try:
+                self.ignored[path] = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                self.ignored.pop(path, None)
+
+    def stop(self) -> None:
+        self.observer.stop()
+        self.observer.join()
+
+
+def make_watcher(
+    roots: list[Path],
+    list_files: Callable[[], Iterable[Path]],
+    accept: Callable[[Path], bool],
+    interval: float,
+    force_polling: bool = False,
+) -> PollingWatcher | NotifyWatcher:
+    if Observer is not None and not force_polling:
+        return NotifyWatcher(roots, accept)
+    return PollingWatcher(list_files, interval)
+
+
+class SyncServer:
+    """Accept sync requests on a Unix socket in a background thread.
+
+    A request is the list of files to process, one per line; wake is set
+    when one arrives. The daemon takes the pending requests, processes
+    their files and calls done() to unblock the clients.
+    """
+
+    def __init__(self, path: Path = SYNC_SOCKET_PATH) -> None:
+        self.path = path
+        self.wake = threading.Event()
+        self.lock = threading.Lock()
+        self.requests: list[tuple[socket.socket, list[str]]] = []
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)  # left by a daemon that was killed
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(str(path))
+        self.server.listen()
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return  # closed by stop()
+            connection.settimeout(10)
+            try:
+                with connection.makefile("rb") as reader:
+                    paths = [line.decode("utf-8").rstrip("\n") for line in reader]
+            except (OSError, UnicodeDecodeError):
+                connection.close()
+                continue
+            with self.lock:
+                self.requests.append((connection, [path for path in paths if path]))
+                self.wake.set()
+
+    def take(self) -> list[tuple[socket.socket, list[str]]]:
+        with self.lock:
+            requests, self.requests = self.requests, []
+            self.wake.clear()
+        return requests
+
+    def done(self, requests: list[tuple[socket.socket, list[str]]]) -> None:
+        for connection, _ in requests:
+            try:
+                connection.sendall(SYNC_DONE)
+            except OSError:
+                pass  # the client gave up waiting
+            finally:
+                connection.close()
+
+    def stop(self) -> None:
+        self.server.close()
+        self.path.unlink(missing_ok=True)
+        self.done(self.take())
+
+
+def request_sync(
+    paths: Iterable[str], path: Path = SYNC_SOCKET_PATH, timeout: float = 300
+) -> bool:
+    """Ask the daemon to process paths and wait until it did.
+
+    Returns False when no daemon answered in time.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(str(path))
+            client.sendall("".join(f"{p}\n" for p in paths).encode("utf-8"))
+            client.shutdown(socket.SHUT_WR)
+            return client.recv(len(SYNC_DONE)) == SYNC_DONE
+    except OSError:
+        return False
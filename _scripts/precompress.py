@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+"""
+Precompress the text files of _site.
+
+Writes a .gz sibling at the maximum gzip level, and a .br sibling when the
+optional brotli package is installed, for every compressible file above a
+size threshold, so that the server can send them without compressing on the
+fly. A sibling is only kept when it is smaller than the file.
+
+Opt-in: only useful on a host that serves precompressed siblings (nginx
+gzip_static/brotli_static, Caddy precompressed...). GitHub Pages, where the
+site is published, compresses on the fly and never serves them, so this
+script is not part of the default render. Run it after quarto render, or add
+it to project.post-render in _quarto.yml after post_render.py.
+
+Files are compressed in a process pool. A file is skipped when its siblings
+are newer than it and were made from the same content: the sha256 of each
+source is recorded in .quarto/precompress-cache.json. Siblings of files that
+no longer exist are removed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional dependency, only .gz siblings are written
+    brotli = None
+
+WATCH_ENV_VAR = "POST_RENDER_WATCH"
+DEFAULT_CACHE_PATH = Path(".quarto/precompress-cache.json")
+COMPRESSIBLE_SUFFIXES = {
+    ".html", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".xml", ".txt", ".ico",
+}
+# Below this size the compressed response is not worth a second file.
+DEFAULT_MIN_SIZE = 1024
+
+
+def encodings(use_brotli: bool) -> tuple[str, ...]:
+    return ("gz", "br") if use_brotli else ("gz",)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the output identical for identical input.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def sibling(path: Path, encoding: str) -> Path:
+    return path.with_name(f"{path.name}.{encoding}")
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(path: Path, entry: dict | None, digest: str, use_brotli: bool) -> bool:
+    if not entry or entry.get("sha256") != digest:
+        return False
+    if set(entry) - {"sha256", "size"} != set(encodings(use_brotli)):
+        return False  # brotli installed or removed since the last run
+    source_mtime = path.stat().st_mtime_ns
+    for encoding in encodings(use_brotli):
+        size = entry[encoding]
+        if size is None:
+            continue  # not worth compressing, no sibling
+        compressed = sibling(path, encoding)
+        try:
+            if compressed.stat().st_mtime_ns < source_mtime or compressed.stat().st_size != size:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def precompress_file(path: Path, entry: dict | None, use_brotli: bool) -> tuple[dict, bool]:
+    """Write the siblings of path unless fresh; return (cache entry, compressed).
+
+    Entry sizes are None for encodings whose output is not smaller.
+    """
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if is_fresh(path, entry, digest, use_brotli):
+        return entry, False
+
+    new_entry: dict = {"sha256": digest, "size": len(data)}
+    for encoding in encodings(use_brotli):
+        compressed = compress(data, encoding)
+        target = sibling(path, encoding)
+        if len(compressed) < len(data):
+            write_atomic(target, compressed)
+            new_entry[encoding] = len(compressed)
+        else:
+            target.unlink(missing_ok=True)
+            new_entry[encoding] = None
+    if not use_brotli:
+        sibling(path, "br").unlink(missing_ok=True)
+    return new_entry, True
+
+
+def iter_compressible(root: Path, min_size: int):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if path.suffix.lower() in COMPRESSIBLE_SUFFIXES and path.stat().st_size >= min_size:
+                yield path
+
+
+def load_cache(cache_path: Path) -> dict[str, dict]:
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data.get("files", {}) if isinstance(data, dict) else {}
+
+
+def save_cache(cache_path: Path, files: dict[str, dict]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    tmp_path.write_text(json.dumps({"files": files}, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, cache_path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write .gz/.br siblings of the files of _site.")
+    parser.add_argument("root", nargs="?", default="_site", help="Site directory (default: _site).")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count, 1 = serial).",
+    )
+    parser.add_argument(
+        "--min-size",
+        type=int,
+        default=DEFAULT_MIN_SIZE,
+        help=f"Smallest file compressed, in bytes (default: {DEFAULT_MIN_SIZE}).",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=DEFAULT_CACHE_PATH,
+        help=f"Content-hash cache file (default: {DEFAULT_CACHE_PATH}).",
+    )
+    parser.add_argument(
+        "--no-brotli",
+        action="store_true",
+        help="Only write .gz siblings, even if brotli is installed.",
+    )
+    args = parser.parse_args()
+
+    if os.environ.get(WATCH_ENV_VAR):
+        print(f"precompress: {WATCH_ENV_VAR} is set, skipped during preview")
+        return 0
+
+    root = Path(args.root)
+    use_brotli = brotli is not None and not args.no_brotli
+    cache = load_cache(args.cache)
+    files = list(iter_compressible(root, args.min_size))
+    entries = [cache.get(path.as_posix()) for path in files]
+
+    worker = partial(precompress_file, use_brotli=use_brotli)
+    if args.jobs <= 1 or len(files) <= 1:
+        results = list(map(worker, files, entries))
+    else:
+        workers = min(args.jobs, len(files))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(files) // (workers * 4))
+            results = list(executor.map(worker, files, entries, chunksize=chunksize))
+
+    new_cache: dict[str, dict] = {}
+    compressed_count = 0
+    for path, (entry, compressed) in zip(files, results):
+        new_cache[path.as_posix()] = entry
+        compressed_count += compressed
+
+    # Siblings written by a previous run for files that are gone or too small.
+    for path_key in set(cache) - set(new_cache):
+        for encoding in ("gz", "br"):
+            sibling(Path(path_key), encoding).unlink(missing_ok=True)
+    save_cache(args.cache, new_cache)
+
+    total = sum(entry["size"] for entry in new_cache.values())
+    summary = []
+    for encoding in encodings(use_brotli):
+        compressed_total = sum(
+            entry[encoding] if entry.get(encoding) is not None else entry["size"]
+            for entry in new_cache.values()
+        )
+        summary.append(f"{encoding}: {total - compressed_total} bytes saved of {total}")
+    print(
+        f"precompress done: {compressed_count} file(s) compressed, "
+        f"{len(files) - compressed_count} fresh ({'; '.join(summary)})"
+    )
+    if brotli is None:
+        print("precompress: brotli is not installed, .br siblings skipped")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
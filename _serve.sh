@@ -9,6 +9,7 @@ IFS=$'\n\t'
 # - it finds an available host_port (starting from 4444 by default),
 # - detects the IPv4 address of the default network interface,
 # - prints the preview URL and its QR code,
+# - starts the post-render daemon (`_scripts/post_render.py --watch`),
 # - then launches `quarto preview`.
 #
 # Works on macOS only.
@@ -98,9 +99,16 @@ run_quarto_preview() {
     local host_ip="${1}"
     local host_port="${2}"
     local quarto_pid
+    local watch_pid
     local sig
 
-    quarto preview \
+    # Keep the post-render stages warm in a long-running process; the
+    # post-render step run by Quarto then hands it the rendered files and
+    # waits until they are processed, before the browser reloads.
+    python3 _scripts/post_render.py --watch &
+    watch_pid=$!
+
+    POST_RENDER_WATCH=1 quarto preview \
         --host "${host_ip}" \
         --port "${host_port}" &
     quarto_pid=$!
@@ -115,6 +123,10 @@ run_quarto_preview() {
             echo "Stopping Quarto preview (${sig})..."
             kill -"${sig}" "${quarto_pid}" >/dev/null 2>&1 || true
         fi
+
+        if kill -0 "${watch_pid}" >/dev/null 2>&1; then
+            kill -"${sig}" "${watch_pid}" >/dev/null 2>&1 || true
+        fi
     }
 
     trap 'cleanup INT' INT
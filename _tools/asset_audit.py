@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+
+"""
+Web audit of the images of the site (PNG, JPEG, WebP, GIF, SVG).
+
+Replaces png_web_audit.sh: the same fields (disk size, dimensions, colour
+type, depth, alpha, unique colours, RAM estimate, ICC profile, PNG chunks,
+resolution, interlace) are read by decoding the files in-process with Pillow
+instead of calling magick/exiftool/pngcheck, in a process pool over the whole
+tree. Each file also gets an estimate of its wasted bytes:
+
+- PNG: bytes saved by a lossless re-encode (zlib optimize, palette when the
+  image has at most 256 colours), ICC profile kept;
+- JPEG: EXIF/XMP/comment segments (ICC and Adobe segments are kept);
+- SVG: comments, metadata, editor data and blank space between tags.
+
+Results are cached by content hash in .quarto/asset-audit-cache.json, so
+only new or modified files are decoded again. The report is sorted by wasted
+bytes and can be saved as JSON or CSV.
+
+usage:
+python3 _tools/asset_audit.py [PATH...] [--json report.json] [--csv report.csv]
+python3 _tools/asset_audit.py --show images/og-image-1.png
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import struct
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency, only SVGs are audited without it
+    Image = None
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow built without littlecms
+    ImageCms = None
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+CACHE_PATH = ROOT_DIR / ".quarto" / "asset-audit-cache.json"
+# Bump when the fields or the wasted bytes estimate change.
+CACHE_VERSION = 1
+DEFAULT_PATHS = ("images", "pages", "posts")
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+SUFFIXES = RASTER_SUFFIXES | {".svg"}
+SKIP_DIRS = {".git", ".quarto", "_site", "node_modules", "__pycache__"}
+FIELDS = (
+    "path",
+    "format",
+    "bytes",
+    "wasted_bytes",
+    "width",
+    "height",
+    "color_type",
+    "mode",
+    "depth_bits",
+    "alpha",
+    "unique_colors",
+    "ram_rgb8",
+    "ram_rgba8",
+    "icc_profile",
+    "chunks",
+    "metadata_bytes",
+    "dpi",
+    "interlace",
+    "error",
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COLOR_TYPES = {
+    0: "Grayscale",
+    2: "TrueColor",
+    3: "Palette",
+    4: "GrayscaleAlpha",
+    6: "TrueColorAlpha",
+}
+# Ancillary chunks that browsers ignore (caBX: C2PA content credentials).
+PNG_METADATA_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"tIME", b"caBX"}
+# JPEG segments kept by an optimiser: JFIF, ICC profile, Adobe colour transform.
+JPEG_KEPT_SEGMENTS = {0xE0, 0xE2, 0xEE}
+MODE_DEPTHS = {"1": 1, "I;16": 16, "I;16B": 16, "I": 32, "F": 32}
+
+SVG_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+SVG_METADATA_ELEMENT_RE = re.compile(
+    r"<(metadata|sodipodi:namedview)\b[^>]*?(?:/>|>.*?</\1>)", re.DOTALL
+)
+SVG_EDITOR_ATTR_RE = re.compile(r'\s(?:inkscape|sodipodi):[\w.-]+="[^"]*"')
+SVG_INTER_TAG_SPACE_RE = re.compile(r">\s+<")
+SVG_LENGTH_RE = re.compile(r"^\s*([\d.]+)\s*(px)?\s*$")
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_assets(paths: list[Path]):
+    for path in paths:
+        if path.is_file():
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(name for name in dirnames if name not in SKIP_DIRS)
+            for filename in sorted(filenames):
+                if Path(filename).suffix.lower() in SUFFIXES:
+                    yield Path(dirpath) / filename
+
+
+def png_chunks(data: bytes) -> tuple[list[str], int, dict]:
+    """Return (chunk types in order, metadata bytes, IHDR fields)."""
+    chunks: list[str] = []
+    metadata_bytes = 0
+    ihdr: dict = {}
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset : offset + 8])
+        if chunk_type == b"IHDR" and length >= 13:
+            _, _, depth, color_type, _, _, interlace = struct.unpack(
+                ">IIBBBBB", data[offset + 8 : offset + 21]
+            )
+            ihdr = {"depth": depth, "color_type": color_type, "interlace": interlace}
+        name = chunk_type.decode("latin-1")
+        if name not in chunks:
+            chunks.append(name)
+        if chunk_type in PNG_METADATA_CHUNKS:
+            metadata_bytes += length + 12
+        offset += length + 12
+        if chunk_type == b"IEND":
+            break
+    return chunks, metadata_bytes, ihdr
+
+
+def jpeg_segments(data: bytes) -> tuple[list[str], int, bool]:
+    """Return (segment names in order, metadata bytes, progressive)."""
+    segments: list[str] = []
+    metadata_bytes = 0
+    progressive = False
+    offset = 2  # SOI
+    while offset + 4 <= len(data) and data[offset] == 0xFF:
+        marker = data[offset + 1]
+        if marker == 0xFF:  # fill byte
+            offset += 1
+            continue
+        if marker == 0xDA:  # start of scan: entropy-coded data follows
+            segments.append("SOS")
+            break
+        (length,) = struct.unpack(">H", data[offset + 2 : offset + 4])
+        if 0xE0 <= marker <= 0xEF:
+            name = f"APP{marker - 0xE0}"
+            if marker not in JPEG_KEPT_SEGMENTS:
+                metadata_bytes += length + 2
+        elif marker == 0xFE:
+            name = "COM"
+            metadata_bytes += length + 2
+        else:
+            name = f"{marker:02X}"
+            progressive = progressive or marker in (0xC2, 0xC6, 0xCA, 0xCE)
+        if name not in segments:
+            segments.append(name)
+        offset += length + 2
+    return segments, metadata_bytes, progressive
+
+
+def icc_description(icc: bytes | None) -> str:
+    if not icc:
+        return "none"
+    if ImageCms is None:
+        return "present"
+    try:
+        profile = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+        return ImageCms.getProfileDescription(profile).strip() or "present"
+    except (OSError, ImageCms.PyCMSError):
+        return "invalid"
+
+
+def lossless_png_size(image, icc: bytes | None, unique_colors: int | None) -> int:
+    """Size of the smallest lossless PNG re-encode of image."""
+    candidates = [image]
+    if unique_colors is not None and unique_colors <= 256 and image.mode in ("RGB", "RGBA"):
+        # Exact palette: every colour of the image gets its own entry.
+        candidates.append(image.quantize(colors=256, method=Image.Quantize.FASTOCTREE, dither=0))
+    sizes = []
+    for candidate in candidates:
+        if candidate is not image and candidate.convert(image.mode).tobytes() != image.tobytes():
+            continue  # the palette lost colours, not lossless
+        buffer = io.BytesIO()
+        options = {"optimize": True}
+        if icc:
+            options["icc_profile"] = icc
+        candidate.save(buffer, "PNG", **options)
+        sizes.append(buffer.tell())
+    return min(sizes)
+
+
+def audit_raster(data: bytes) -> dict:
+    record: dict = {}
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        width, height = image.size
+        icc = image.info.get("icc_profile")
+        colors = image.getcolors(maxcolors=width * height)
+        unique_colors = len(colors) if colors is not None else None
+        dpi = image.info.get("dpi")
+        record.update(
+            format=image.format,
+            width=width,
+            height=height,
+            mode=image.mode,
+            color_type=image.mode,
+            depth_bits=MODE_DEPTHS.get(image.mode, 8),
+            alpha="A" in image.getbands() or "transparency" in image.info,
+            unique_colors=unique_colors,
+            ram_rgb8=width * height * 3,
+            ram_rgba8=width * height * 4,
+            icc_profile=icc_description(icc),
+            dpi=f"{dpi[0]:g}x{dpi[1]:g}" if dpi else "",
+            interlace=bool(image.info.get("interlace") or image.info.get("progressive")),
+            metadata_bytes=0,
+            wasted_bytes=0,
+        )
+        if image.format == "PNG":
+            chunks, metadata_bytes, ihdr = png_chunks(data)
+            record.update(
+                chunks=",".join(chunks),
+                metadata_bytes=metadata_bytes,
+                color_type=PNG_COLOR_TYPES.get(ihdr.get("color_type"), image.mode),
+                depth_bits=ihdr.get("depth", record["depth_bits"]),
+                interlace=bool(ihdr.get("interlace")),
+            )
+            if not getattr(image, "is_animated", False):
+                reencoded = lossless_png_size(image, icc, unique_colors)
+                record["wasted_bytes"] = max(0, len(data) - reencoded)
+        elif image.format == "JPEG":
+            segments, metadata_bytes, progressive = jpeg_segments(data)
+            record.update(
+                chunks=",".join(segments),
+                metadata_bytes=metadata_bytes,
+                interlace=progressive,
+                wasted_bytes=metadata_bytes,
+            )
+    return record
+
+
+def svg_length(value: str | None) -> float | None:
+    match = SVG_LENGTH_RE.match(value or "")
+    return float(match.group(1)) if match else None
+
+
+def audit_svg(data: bytes) -> dict:
+    text = data.decode("utf-8")
+    root = ET.fromstring(data)
+    width = svg_length(root.get("width"))
+    height = svg_length(root.get("height"))
+    view_box = (root.get("viewBox") or "").replace(",", " ").split()
+    if (width is None or height is None) and len(view_box) == 4:
+        width, height = float(view_box[2]), float(view_box[3])
+    stripped = SVG_COMMENT_RE.sub("", text)
+    stripped = SVG_METADATA_ELEMENT_RE.sub("", stripped)
+    stripped = SVG_EDITOR_ATTR_RE.sub("", stripped)
+    minified = stripped
+    if "<text" not in minified:
+        # Blank space is only significant inside text elements.
+        minified = SVG_INTER_TAG_SPACE_RE.sub("><", minified)
+    minified = minified.strip()
+    try:
+        ET.fromstring(minified)
+    except ET.ParseError:
+        stripped = minified = text
+    return {
+        "format": "SVG",
+        "width": round(width) if width is not None else None,
+        "height": round(height) if height is not None else None,
+        "metadata_bytes": len(data) - len(stripped.encode("utf-8")),
+        "wasted_bytes": max(0, len(data) - len(minified.encode("utf-8"))),
+    }
+
+
+def audit_file(path: Path) -> dict:
+    """Audit one file. Runs in a worker process; errors are recorded."""
+    data = path.read_bytes()
+    record: dict = {"bytes": len(data), "wasted_bytes": 0}
+    try:
+        if path.suffix.lower() == ".svg":
+            record.update(audit_svg(data))
+        elif Image is not None:
+            record.update(audit_raster(data))
+        else:
+            record["format"] = path.suffix.lstrip(".").upper()
+            record["error"] = "Pillow is not installed"
+    except Exception as exc:
+        record["error"] = f"{type(exc).__name__}: {exc}"
+    return record
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        cache = {}
+    return {"records": cache.get("records", {}), "files": cache.get("files", {})}
+
+
+def save_cache(path: Path, cache: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, **cache}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def content_hash(path: Path, files: dict) -> str:
+    """Hash of path, reused from the cache while its mtime and size match."""
+    stat = path.stat()
+    key = str(path.resolve())
+    known = files.get(key)
+    if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+        return known[2]
+    digest = file_digest(path)
+    files[key] = [stat.st_mtime_ns, stat.st_size, digest]
+    return digest
+
+
+def prune_cache(cache: dict, roots: list[Path], files: list[Path]) -> None:
+    """Forget the files under roots that the scan did not find.
+
+    Entries outside roots (a scan of one file keeps the rest of the tree) are
+    kept, and so are the records any remaining entry still points at.
+    """
+    scanned = [str(root.resolve()) for root in roots]
+    seen = {str(path.resolve()) for path in files}
+
+    def stale(key: str) -> bool:
+        if key in seen:
+            return False
+        return any(key == root or key.startswith(root + os.sep) for root in scanned)
+
+    cache["files"] = {key: value for key, value in cache["files"].items() if not stale(key)}
+    live = {value[2] for value in cache["files"].values()}
+    cache["records"] = {key: value for key, value in cache["records"].items() if key in live}
+
+
+def human_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.2f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+def print_details(row: dict) -> None:
+    """Print one file like png_web_audit.sh did."""
+    print(f'\n# WEB AUDIT\n\nfile: "{row["path"]}"')
+    print(f"disk_size:\n  bytes: {row['bytes']}\n  human: \"{human_size(row['bytes'])}\"")
+    print(f"dimensions:\n  width: {row.get('width')}\n  height: {row.get('height')}")
+    if row.get("format") != "SVG":
+        print(
+            f"color_model:\n  type: \"{row.get('color_type')}\"\n  mode: \"{row.get('mode')}\"\n"
+            f"  depth_bits: {row.get('depth_bits')}\n  alpha: {str(row.get('alpha')).lower()}"
+        )
+        print(f"unique_colors: {row.get('unique_colors')}")
+        for key in ("ram_rgb8", "ram_rgba8"):
+            if row.get(key) is not None:
+                print(f"{key}:\n  bytes: {row[key]}\n  human: \"{human_size(row[key])}\"")
+        print(f'icc_profile: "{row.get("icc_profile")}"')
+        print(f'chunks: "{row.get("chunks", "")}"')
+        print(f'dpi: "{row.get("dpi", "")}"\ninterlace: {str(row.get("interlace")).lower()}')
+    print(f"metadata_bytes: {row.get('metadata_bytes', 0)}")
+    print(f"wasted_bytes: {row['wasted_bytes']}")
+    if row.get("error"):
+        print(f'error: "{row["error"]}"')
+
+
+def write_csv(path: Path, rows: list[dict]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Web audit of the images of the site")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        type=Path,
+        help=f"Files or directories (default: {' '.join(DEFAULT_PATHS)})",
+    )
+    parser.add_argument("--json", type=Path, help="Save the report as JSON")
+    parser.add_argument("--csv", type=Path, help="Save the report as CSV")
+    parser.add_argument("--top", type=int, default=20, help="Files listed (default: 20)")
+    parser.add_argument("--show", action="store_true", help="Print every field of each file")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes",
+    )
+    parser.add_argument("--force", action="store_true", help="Ignore the cache")
+    args = parser.parse_args()
+
+    if Image is None:
+        print("WARNING: Pillow is not installed, only SVGs are audited", file=sys.stderr)
+    started = time.perf_counter()
+    paths = args.paths or [ROOT_DIR / name for name in DEFAULT_PATHS]
+    roots = [path for path in paths if path.exists()]
+    files = list(iter_assets(roots))
+    cache = load_cache(CACHE_PATH)
+
+    digests = [content_hash(path, cache["files"]) for path in files]
+    # Identical files are decoded once.
+    todo: dict[str, Path] = {}
+    for path, digest in zip(files, digests):
+        if (args.force or digest not in cache["records"]) and digest not in todo:
+            todo[digest] = path
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(todo)))) as executor:
+            for digest, record in zip(todo, executor.map(audit_file, todo.values(), chunksize=4)):
+                cache["records"][digest] = record
+
+    rows = []
+    for path, digest in zip(files, digests):
+        try:
+            shown_path = path.relative_to(ROOT_DIR).as_posix()
+        except ValueError:
+            shown_path = path.as_posix()
+        rows.append({"path": shown_path, "sha256": digest, **cache["records"][digest]})
+    rows.sort(key=lambda row: (-row["wasted_bytes"], -row["bytes"], row["path"]))
+
+    prune_cache(cache, roots, files)
+    save_cache(CACHE_PATH, cache)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+    if args.csv:
+        write_csv(args.csv, rows)
+
+    if args.show:
+        for row in rows:
+            print_details(row)
+        return 0
+
+    for row in rows[: args.top]:
+        size = f"{row.get('width')}x{row.get('height')}"
+        print(
+            f"{row['wasted_bytes']:>10} {row['bytes']:>10} {row.get('format') or '?':<5} "
+            f"{size:>11} {row['path']}"
+        )
+    total_bytes = sum(row["bytes"] for row in rows)
+    wasted = sum(row["wasted_bytes"] for row in rows)
+    errors = sum(1 for row in rows if row.get("error"))
+    print(
+        f"Summary: files={len(rows)} decoded={len(todo)} "
+        f"errors={errors} bytes={human_size(total_bytes)} wasted={human_size(wasted)} "
+        f"in {time.perf_counter() - started:.2f} s"
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the post-render scripts on synthetic sites.
+
+Generates a _site tree of N posts for each size (Quarto-like pages with the
+prev/next block of _includes/prev-next-include.html, images without alt,
+type attributes on script/link/style tags, a listing home page and a
+sitemap.xml), then times get_post_names, get_prev_next_links,
+inject_prev_next_into_posts and apply_cleanup on it. Each size runs in its own
+process so that the peak RSS reported is the one of that size only.
+
+usage:
+python3 _tools/benchmark_post_render.py [--sizes 100 1000 10000] [--workdir DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "_scripts"))
+
+from create_prev_next_buttons import (  # noqa: E402
+    get_post_names,
+    get_prev_next_links,
+    inject_prev_next_into_posts,
+)
+from post_process_cleanup import apply_cleanup, iter_target_files  # noqa: E402
+
+DEFAULT_SIZES = (100, 1000, 10000)
+SITE_URL = "https://ouilogique.com"
+NAV_INCLUDE = REPO_ROOT / "_includes" / "prev-next-include.html"
+WORDS = (
+    "arduino microcontrôleur tension courant résistance python script "
+    "fichier linux terminal mesure capteur carte programme fonction boucle "
+    "registre horloge port série afficheur écran batterie module"
+).split()
+
+PAGE_TEMPLATE = """\
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" lang="fr" xml:lang="fr"><head>
+<meta charset="utf-8">
+<meta name="generator" content="quarto-1.6.40">
+<meta name="viewport" content="width=device-width, initial-scale=1.0, user-scalable=yes">
+<meta name="dcterms.date" content="{date}">
+<title>{title} – ouilogique.com</title>
+<style type="text/css">
+code{{white-space: pre-wrap;}}
+span.smallcaps{{font-variant: small-caps;}}
+div.columns{{display: flex; gap: min(4vw, 1.5em);}}
+</style>
+<script type="text/javascript" src="../../site_libs/quarto-nav/quarto-nav.js"></script>
+<script type="text/javascript" src="../../site_libs/clipboard/clipboard.min.js"></script>
+<script type="text/javascript" src="../../site_libs/quarto-search/fuse.min.js"></script>
+<link type="text/css" href="../../site_libs/quarto-html/tippy.css" rel="stylesheet">
+<link type="text/css" href="../../site_libs/bootstrap/bootstrap-icons.css" rel="stylesheet">
+<link href="../../styles.css" rel="stylesheet">
+</head>
+<body class="nav-fixed fullcontent quarto-light">
+<div id="quarto-search-results"></div>
+<header id="quarto-header" class="headroom fixed-top">
+<nav class="navbar navbar-expand-lg" data-bs-theme="dark">
+<div class="navbar-container container-fluid">
+<a class="navbar-brand" href="../../index.html"><img src="../../images/logo.png" class="navbar-logo"><span class="navbar-title">ouilogique.com</span></a>
+</div>
+</nav>
+</header>
+<div id="quarto-content" class="quarto-container page-columns page-rows-contents page-layout-article page-navbar">
+<main class="content" id="quarto-document-content">
+<header id="title-block-header" class="quarto-title-block default">
+<div class="quarto-title"><h1 class="title">{title}</h1></div>
+<div class="quarto-title-meta"><div><div class="quarto-title-meta-heading">Date de publication</div>
+<div class="quarto-title-meta-contents"><p class="date">{date}</p></div></div></div>
+</header>
+{body}
+{nav}
+</main>
+</div>
+<script id="quarto-html-after-body" type="application/javascript">
+window.document.addEventListener("DOMContentLoaded", function (event) {{
+  const icon = "\ue9cb";
+  const anchorJS = new window.AnchorJS();
+}});
+</script>
+<script src="/scripts.js"></script>
+</body></html>
+"""
+
+HOME_TEMPLATE = """\
+<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>ouilogique.com</title>
+<script type="text/javascript" src="site_libs/quarto-nav/quarto-nav.js"></script>
+</head>
+<body class="nav-fixed">
+<main class="content" id="quarto-document-content">
+<div class="list quarto-listing-default">
+{items}
+</div>
+{nav}
+</main>
+</body></html>
+"""
+
+HOME_ITEM_TEMPLATE = """\
+<div class="quarto-post image-right" data-index="{index}">
+<div class="thumbnail"><a href="./posts/{name}/index.html"><img src="./posts/{name}/image.png" class="thumbnail-image"></a></div>
+<div class="body"><h3 class="no-anchor listing-title"><a href="./posts/{name}/index.html">{title}</a></h3>
+<div class="listing-description"><a href="./posts/{name}/index.html">{summary}</a></div></div>
+</div>"""
+
+
+def random_sentence(rng: random.Random, words: int = 14) -> str:
+    sentence = " ".join(rng.choice(WORDS) for _ in range(words))
+    return sentence[:1].upper() + sentence[1:] + "."
+
+
+def random_body(rng: random.Random) -> str:
+    parts = []
+    for section in range(rng.randint(3, 6)):
+        parts.append(f'<section id="section-{section}" class="level2">')
+        parts.append(f'<h2 class="anchored">{random_sentence(rng, 4)}</h2>')
+        for _ in range(rng.randint(2, 6)):
+            parts.append(f"<p>{' '.join(random_sentence(rng) for _ in range(4))}</p>")
+        parts.append(f'<p><img src="images/figure-{section}.png" class="img-fluid"></p>')
+        parts.append(
+            '<div class="sourceCode"><pre class="sourceCode python"><code class="sourceCode python">'
+            + "\n".join(f"x{i} = {i} * 2  # {rng.choice(WORDS)}" for i in range(rng.randint(3, 12)))
+            + "</code></pre></div>"
+        )
+        parts.append("</section>")
+    return "\n".join(parts)
+
+
+def generate_site(root: Path, size: int, seed: int = 0) -> None:
+    """Write a synthetic _site (and posts/ sources) of size posts in root."""
+    rng = random.Random(seed)
+    nav = NAV_INCLUDE.read_text(encoding="utf-8")
+    site = root / "_site"
+    names = []
+    day = 0
+    for index in range(size):
+        day += rng.randint(1, 3)
+        year, rest = divmod(day, 336)
+        date = f"{2000 + year:04d}-{rest // 28 + 1:02d}-{rest % 28 + 1:02d}"
+        name = f"{date}-post-{index:05d}"
+        title = random_sentence(rng, 5).rstrip(".")
+        names.append((name, date, title))
+
+        page = PAGE_TEMPLATE.format(date=date, title=title, body=random_body(rng), nav=nav)
+        post_dir = site / "posts" / name
+        post_dir.mkdir(parents=True)
+        (post_dir / "index.html").write_text(page, encoding="utf-8")
+
+        source_dir = root / "posts" / name
+        source_dir.mkdir(parents=True)
+        (source_dir / "index.qmd").write_text(
+            f'---\ntitle: "{title}"\ndate: {date}\n---\n\n{random_sentence(rng)}\n',
+            encoding="utf-8",
+        )
+
+    items = "\n".join(
+        HOME_ITEM_TEMPLATE.format(index=i, name=name, title=title, summary=random_sentence(rng))
+        for i, (name, _, title) in enumerate(reversed(names[-50:]))
+    )
+    (site / "index.html").write_text(HOME_TEMPLATE.format(items=items, nav=nav), encoding="utf-8")
+    urls = "".join(f"<url><loc>{SITE_URL}/posts/{name}/</loc></url>" for name, _, _ in names)
+    (site / "sitemap.xml").write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>',
+        encoding="utf-8",
+    )
+    (site / "scripts.js").write_text('const icon = "\ue9cb";\n', encoding="utf-8")
+
+
+def site_bytes(paths: list[Path]) -> int:
+    return sum(path.stat().st_size for path in paths)
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def timed(results: list[dict], phase: str, files: int, nbytes: int, func, *args):
+    started = time.perf_counter()
+    value = func(*args)
+    seconds = time.perf_counter() - started
+    results.append(
+        {
+            "phase": phase,
+            "files": files,
+            "bytes": nbytes,
+            "seconds": seconds,
+            "peak_rss_mib": peak_rss_mib(),
+        }
+    )
+    return value
+
+
+def run_size(size: int, workdir: str | None) -> dict:
+    """Generate a site of size posts and time each phase on it."""
+    root = Path(tempfile.mkdtemp(prefix=f"post-render-bench-{size}-", dir=workdir))
+    previous_cwd = os.getcwd()
+    results: list[dict] = []
+    try:
+        generate_site(root, size)
+        os.chdir(root)
+        post_files = sorted(Path("_site/posts").glob("*/index.html"))
+        post_bytes = site_bytes(post_files)
+
+        # The scripts log every step; only the timings are of interest here.
+        with contextlib.redirect_stderr(io.StringIO()), contextlib.redirect_stdout(io.StringIO()):
+            post_names = timed(results, "get_post_names", size, 0, get_post_names)
+            links = timed(
+                results, "get_prev_next_links", size, 0, get_prev_next_links, post_names
+            )
+            timed(
+                results,
+                "inject_prev_next_into_posts",
+                len(post_files),
+                post_bytes,
+                inject_prev_next_into_posts,
+                links,
+            )
+            cleanup_files = list(iter_target_files([Path("_site")]))
+            timed(
+                results,
+                "apply_cleanup",
+                len(cleanup_files),
+                site_bytes(cleanup_files),
+                lambda: [apply_cleanup(file_path) for file_path in cleanup_files],
+            )
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(root, ignore_errors=True)
+    return {"size": size, "phases": results}
+
+
+def print_results(run: dict) -> None:
+    print(f"{run['size']} posts:")
+    for phase in run["phases"]:
+        seconds = phase["seconds"]
+        files_per_s = phase["files"] / seconds if seconds else 0.0
+        line = (
+            f"  {phase['phase']:<28} {seconds * 1000:10.1f} ms  "
+            f"{files_per_s:10.0f} files/s"
+        )
+        if phase["bytes"]:
+            line += f"  {phase['bytes'] / (1 << 20) / seconds:8.2f} MB/s"
+        else:
+            line += " " * 15
+        line += f"  peak RSS {phase['peak_rss_mib']:7.1f} MiB"
+        print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the post-render scripts.")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Number of posts of each synthetic site (default: 100 1000 10000).",
+    )
+    parser.add_argument(
+        "--workdir",
+        help="Directory for the generated sites (default: system temp dir).",
+    )
+    parser.add_argument(
+        "--json",
+        type=Path,
+        help="Also write the results to this JSON file.",
+    )
+    args = parser.parse_args()
+
+    runs = []
+    for size in args.sizes:
+        # A fresh process per size keeps peak RSS and caches independent.
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            run = executor.submit(run_size, size, args.workdir).result()
+        print_results(run)
+        runs.append(run)
+
+    if args.json:
+        args.json.write_text(json.dumps({"runs": runs}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+"""
+Build the PNG figures of the matplotlib scripts of the posts.
+
+Every posts/*/docs/*.py that imports matplotlib is a figure script. Each one
+runs in its own worker process with the Agg backend, in a scratch directory
+whose files are then moved to the images/ folder of its post: figures saved
+with plt.savefig() land there, and the figures shown with plt.show() (or left open
+at the end) are saved as <script>-<n>.png instead of opening a window.
+
+Remote datasets are declared by the scripts in a module-level DATASETS dict
+({file name: URL}, read without running the script) and vendored once into
+data/ next to the script, which then reads the local copy, so that builds
+work offline. A figure is rebuilt only when the hash of its script or of its
+datasets changed, or when one of its outputs is missing or was modified.
+The cache is kept in .quarto/figure-cache.json.
+
+Needs matplotlib (and numpy, pandas for the scripts that use them); the site
+build itself does not, since the PNGs are committed.
+
+usage (from the root of the repository):
+python3 _tools/build_figures.py [--jobs N] [--force] [--offline] [SCRIPT...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import runpy
+import sys
+import tempfile
+import time
+import traceback
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+CACHE_PATH = Path(".quarto/figure-cache.json")
+# Bump when the way figures are produced changes, to rebuild them all.
+CACHE_VERSION = 1
+SCRIPTS_GLOB = "posts/*/docs/*.py"
+MATPLOTLIB_IMPORT = re.compile(r"^\s*(?:import|from)\s+matplotlib\b", re.MULTILINE)
+DATA_DIR = "data"
+FETCH_TIMEOUT = 30
+# Some servers (bls.gov) refuse requests without a descriptive User-Agent.
+USER_AGENT = "ouilogique.com figure build (https://ouilogique.com/)"
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_scripts(root: Path) -> list[Path]:
+    return [
+        path
+        for path in sorted(root.glob(SCRIPTS_GLOB))
+        if MATPLOTLIB_IMPORT.search(path.read_text(encoding="utf-8"))
+    ]
+
+
+def declared_datasets(script: Path) -> dict[str, str]:
+    """Return the DATASETS literal of script, {} if it has none."""
+    tree = ast.parse(script.read_text(encoding="utf-8"), filename=str(script))
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+            and node.targets[0].id == "DATASETS"
+        ):
+            datasets = ast.literal_eval(node.value)
+            if not isinstance(datasets, dict) or not all(
+                isinstance(key, str) and isinstance(value, str) for key, value in datasets.items()
+            ):
+                raise ValueError(f"{script}: DATASETS must map file names to URLs")
+            return datasets
+    return {}
+
+
+def vendor_dataset(url: str, path: Path) -> None:
+    """Download url to path, replacing it only once complete."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.part")
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            with open(tmp_path, "wb") as f:
+                while chunk := response.read(1 << 16):
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def dataset_hashes(script: Path, offline: bool, refresh: bool) -> dict[str, str]:
+    """Vendor the datasets of script if needed and return {name: sha256}."""
+    hashes = {}
+    for name, url in sorted(declared_datasets(script).items()):
+        path = script.parent / DATA_DIR / name
+        if refresh or not path.exists():
+            if offline:
+                if path.exists():
+                    hashes[name] = sha256_file(path)
+                    continue
+                raise FileNotFoundError(f"{path} is not vendored yet (run without --offline)")
+            print(f"FETCH {url} -> {path}")
+            vendor_dataset(url, path)
+        hashes[name] = sha256_file(path)
+    return hashes
+
+
+def figure_key(script: Path, datasets: dict[str, str]) -> str:
+    digest = hashlib.sha256(f"{CACHE_VERSION}\0".encode("utf-8"))
+    digest.update(script.read_bytes())
+    for name, file_hash in sorted(datasets.items()):
+        digest.update(f"\0{name}\0{file_hash}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_fresh(entry: dict | None, key: str, out_dir: Path) -> bool:
+    if not entry or entry.get("key") != key or not entry.get("outputs"):
+        return False
+    for name, file_hash in entry["outputs"].items():
+        path = out_dir / name
+        if not path.exists() or sha256_file(path) != file_hash:
+            return False
+    return True
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("figures", {})
+
+
+def save_cache(path: Path, figures: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "figures": figures}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def build_figure(script: str, out_dir: str) -> tuple[list[str], str | None]:
+    """Run script headless and move its figures to out_dir.
+
+    Runs in a worker process. Returns (output names, error or None).
+    """
+    os.environ["MPLBACKEND"] = "Agg"
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+
+    script_path = Path(script).resolve()
+    out_path = Path(out_dir).resolve()
+    out_path.mkdir(parents=True, exist_ok=True)
+    saved: set[int] = set()
+    shown = 0
+    original_savefig = Figure.savefig
+    original_show = plt.show
+
+    def savefig(self, *args, **kwargs):
+        saved.add(id(self))
+        return original_savefig(self, *args, **kwargs)
+
+    def save_open_figures(*args, **kwargs):
+        nonlocal shown
+        for number in plt.get_fignums():
+            figure = plt.figure(number)
+            if id(figure) not in saved:
+                shown += 1
+                figure.savefig(f"{script_path.stem}-{shown}.png")
+        plt.close("all")
+
+    cwd = os.getcwd()
+    argv = sys.argv
+    # Outputs are written to a scratch directory on the same file system, then
+    # moved, so that a failing script does not leave half its figures behind.
+    with tempfile.TemporaryDirectory(dir=out_path, prefix=".build-") as work_dir:
+        try:
+            Figure.savefig = savefig
+            plt.show = save_open_figures
+            os.chdir(work_dir)
+            sys.argv = [str(script_path)]
+            sys.path.insert(0, str(script_path.parent))
+            runpy.run_path(str(script_path), run_name="__main__")
+            save_open_figures()
+        except BaseException as exc:  # SystemExit too: the worker must answer
+            if isinstance(exc, SystemExit) and exc.code in (None, 0):
+                save_open_figures()
+            else:
+                return [], "".join(traceback.format_exception_only(type(exc), exc)).strip()
+        finally:
+            Figure.savefig = original_savefig
+            plt.show = original_show
+            os.chdir(cwd)
+            sys.argv = argv
+        outputs = sorted(path.name for path in Path(work_dir).iterdir() if path.is_file())
+        for name in outputs:
+            os.replace(Path(work_dir) / name, out_path / name)
+    if not outputs:
+        return [], "the script produced no figure"
+    return outputs, None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the figures of the matplotlib posts")
+    parser.add_argument("scripts", nargs="*", type=Path, help="Figure scripts (default: all)")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (default: number of CPUs)",
+    )
+    parser.add_argument("--force", action="store_true", help="Rebuild even fresh figures")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Never download datasets, fail the figures whose data is not vendored",
+    )
+    parser.add_argument(
+        "--refresh-data",
+        action="store_true",
+        help="Download the vendored datasets again",
+    )
+    parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Cache file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    scripts = args.scripts or find_scripts(Path("."))
+    cache = load_cache(args.cache)
+    stale: list[tuple[Path, Path, str]] = []
+    built = failures = fresh = 0
+
+    for script in scripts:
+        out_dir = script.parent.parent / "images"
+        try:
+            datasets = dataset_hashes(script, args.offline, args.refresh_data)
+        except (OSError, ValueError, SyntaxError) as exc:
+            print(f"ERROR {script}: {exc}", file=sys.stderr)
+            failures += 1
+            continue
+        key = figure_key(script, datasets)
+        if not args.force and is_fresh(cache.get(script.as_posix()), key, out_dir):
+            fresh += 1
+            continue
+        stale.append((script, out_dir, key))
+
+    if stale:
+        # One process per script: pyplot state and rcParams (plt.xkcd()...)
+        # must not leak from one script to the next.
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(args.jobs, len(stale))), max_tasks_per_child=1
+        ) as executor:
+            results = executor.map(
+                build_figure,
+                [str(script) for script, _, _ in stale],
+                [str(out_dir) for _, out_dir, _ in stale],
+            )
+            for (script, out_dir, key), (outputs, error) in zip(stale, results):
+                if error:
+                    print(f"ERROR {script}: {error}", file=sys.stderr)
+                    failures += 1
+                    continue
+                previous = cache.get(script.as_posix(), {}).get("outputs", {})
+                for name in set(previous) - set(outputs):
+                    (out_dir / name).unlink(missing_ok=True)
+                    print(f"REMOVE {out_dir / name}")
+                cache[script.as_posix()] = {
+                    "key": key,
+                    "outputs": {name: sha256_file(out_dir / name) for name in outputs},
+                }
+                for name in outputs:
+                    print(f"BUILD {script} -> {out_dir / name}")
+                built += 1
+        save_cache(args.cache, cache)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"figures: {built} built, {fresh} fresh, "
+        f"{failures} failed in {elapsed:.2f} s"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Differential check of the post_process_cleanup.py HTML engines.
+
+Runs the cleanup stages in memory on every HTML page, through the
+run_stages() of the build, once with the "bs4" and once with the "stream"
+engine, and checks that both produce the same DOM (html5lib parse,
+attributes compared as sets) and the same counters. The pages in SAMPLES,
+which hold markup the site does not have yet, are checked first. Nothing is
+written to disk: references are fingerprinted with the index of the assets
+as they are, without copies.
+
+usage:
+python3 _tools/compare_cleanup_engines.py [_site]
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Comment, Doctype, NavigableString, Tag
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "_scripts"))
+
+from fingerprint_assets import build_asset_index  # noqa: E402
+from post_process_cleanup import (  # noqa: E402
+    CLEANUP_STAGES,
+    iter_target_files,
+    load_site_host,
+)
+from post_render_pipeline import STAGES, PipelineContext, run_stages  # noqa: E402
+
+
+# html5lib drops a newline right after these start tags and the bs4
+# serializer does not write it back, so a bs4 round-trip loses it. The stream
+# engine keeps it; leading newlines of these tags are ignored.
+LEADING_NEWLINE_TAGS = {"pre", "textarea", "listing"}
+
+# Synthetic pages: (path the page is cleaned up as, content).
+SAMPLES = [
+    # html5lib reads the content of <title> and <textarea> as text: their
+    # <img> get no alt.
+    (
+        "_site/samples/raw-text.html",
+        "<!DOCTYPE html><html><head><title>a <img src=x.png></title></head><body>"
+        "<textarea><img src=y.png></textarea><img src=w.png></body></html>",
+    ),
+]
+
+
+def canonical_dom(html: str) -> list[str]:
+    """Flatten a document into one line per node, with sorted attributes."""
+    lines: list[str] = []
+
+    def walk(node: Tag, depth: int) -> None:
+        for index, child in enumerate(node.children):
+            indent = "  " * depth
+            if isinstance(child, Tag):
+                attrs = " ".join(
+                    f"{key}={' '.join(value) if isinstance(value, list) else value!r}"
+                    for key, value in sorted(child.attrs.items())
+                )
+                lines.append(f"{indent}<{child.name} {attrs}>")
+                walk(child, depth + 1)
+            elif isinstance(child, (Comment, Doctype)):
+                lines.append(f"{indent}{type(child).__name__}: {child!r}")
+            elif isinstance(child, NavigableString):
+                text = str(child)
+                if index == 0 and node.name in LEADING_NEWLINE_TAGS:
+                    text = text.lstrip("\n")
+                if text:
+                    lines.append(f"{indent}{text!r}")
+
+    walk(BeautifulSoup(html, "html5lib"), 0)
+    return lines
+
+
+def compare_text(content: str, file_path: Path, context: PipelineContext) -> list[str]:
+    """Return a list of differences (empty when both engines agree)."""
+    stages = tuple(STAGES[name] for name in CLEANUP_STAGES)
+    bs4_updated, bs4_counts = run_stages(
+        content, file_path, stages, replace(context, engine="bs4")
+    )
+    stream_updated, stream_counts = run_stages(
+        content, file_path, stages, replace(context, engine="stream")
+    )
+
+    problems = []
+    if bs4_counts != stream_counts:
+        problems.append(f"counters differ: bs4={bs4_counts} stream={stream_counts}")
+    bs4_dom = canonical_dom(bs4_updated)
+    stream_dom = canonical_dom(stream_updated)
+    if bs4_dom != stream_dom:
+        diff = difflib.unified_diff(bs4_dom, stream_dom, "bs4", "stream", n=1, lineterm="")
+        problems.extend(list(diff)[:40])
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check that the bs4 and stream cleanup engines agree."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["_site"],
+        help="Files or directories to check (default: _site).",
+    )
+    args = parser.parse_args()
+
+    context = PipelineContext(
+        site_host=load_site_host(), asset_index=build_asset_index(), write_copies=False
+    )
+    pages = [(Path(path), content) for path, content in SAMPLES]
+    pages += [
+        (file_path, None)
+        for file_path in iter_target_files([Path(p) for p in args.paths])
+        if file_path.suffix.lower() == ".html"
+    ]
+    checked = 0
+    mismatches = 0
+    for file_path, content in pages:
+        if content is None:
+            content = file_path.read_text(encoding="utf-8")
+        checked += 1
+        problems = compare_text(content, file_path, context)
+        if problems:
+            mismatches += 1
+            print(f"MISMATCH {file_path}")
+            for line in problems:
+                print(f"    {line}")
+
+    print(f"engines compared on {checked} page(s): {mismatches} mismatch(es)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -41,7 +41,7 @@ for filename in "${FILENAMES[@]}"; do
     #     "$FILENAME_IN"            \
     #     -o "$FILENAME_OUT"
 
-    source png_web_audit.sh $FILENAME_OUT
+    python3 asset_audit.py --show "$FILENAME_OUT"
 
     pngquant                      \
         --strip                   \
@@ -54,10 +54,10 @@ for filename in "${FILENAMES[@]}"; do
         --output "$FILENAME_OUT" \
         "$FILENAME_OUT"
 
-    source png_web_audit.sh $FILENAME_OUT
+    python3 asset_audit.py --show "$FILENAME_OUT"
 
     open -Wa ImageOptim.app "$FILENAME_OUT"
 
-    source png_web_audit.sh $FILENAME_OUT
+    python3 asset_audit.py --show "$FILENAME_OUT"
 
 done
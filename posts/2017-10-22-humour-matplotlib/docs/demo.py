@@ -27,10 +27,24 @@ clear
 
 """
 
+import os
+
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 
+# Remote data, vendored in data/ next to this script by
+# _tools/build_figures.py so that the figures also build offline.
+DATASETS = {
+    "cu.item": "https://download.bls.gov/pub/time.series/cu/cu.item",
+}
+
+
+def dataset(name):
+    """Local copy of a dataset if it has been vendored, else its URL."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", name)
+    return path if os.path.exists(path) else DATASETS[name]
+
 
 # %%
 if __name__ == "__main__":
@@ -51,8 +65,7 @@ if __name__ == "__main__":
     plt.show()
 
     # Pandas
-    df = pd.read_csv('https://download.bls.gov/pub/time.series/cu/cu.item',
-                     sep='\t')
+    df = pd.read_csv(dataset("cu.item"), sep='\t')
 
     # Matplotlib
     plt.figure(figsize=(10, 5))
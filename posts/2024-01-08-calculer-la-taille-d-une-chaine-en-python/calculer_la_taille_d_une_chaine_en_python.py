@@ -3,35 +3,176 @@ https://www.youtube.com/watch?app=desktop&v=ut74oHojxqo
 
 https://www.youtube.com/watch?v=uTJoJtNYcaQ
 
+The size of a character only changes at a few known code points: the PEP 393
+kinds of CPython strings (ASCII, Latin-1, UCS-2, UCS-4) and the UTF-8/UTF-16
+length boundaries. So instead of measuring each of the 1.1M code points,
+the tables are built from these boundaries, measuring one code point per
+range. --check compares them with the brute-force scan over every code point.
+
+usage:
+python3 calculer_la_taille_d_une_chaine_en_python.py [--check]
 """
 
+import argparse
 import sys
+import time
+
+# First code point of each PEP 393 kind, and of each UTF-8 length.
+RAM_BOUNDARIES = (0, 128, 256, 65536)
+UTF8_BOUNDARIES = (0, 128, 2048, 65536)
+# Lone surrogates are valid str characters but cannot be encoded.
+SURROGATES = range(0xD800, 0xDFFF + 1)
+KINDS = {1: "Latin-1", 2: "UCS-2", 4: "UCS-4"}
+
+
+def breakpoints(boundaries, size_of):
+    """Return [(code point, size)] at each boundary where size_of changes."""
+    rows = []
+    for ucp in boundaries:
+        size = size_of(ucp)
+        if not rows or rows[-1][1] != size:
+            rows.append((ucp, size))
+    return rows
+
+
+def brute_force_breakpoints(code_points, size_of):
+    rows = []
+    last_size = 0
+    for ucp in code_points:
+        size = size_of(ucp)
+        if size != last_size:
+            rows.append((ucp, size))
+            last_size = size
+    return rows
+
+
+def ram_size(ucp):
+    return sys.getsizeof(chr(ucp))
+
+
+def utf8_size(ucp):
+    return sys.getsizeof(chr(ucp).encode("utf-8"))
+
+
+def ram_breakpoints():
+    return breakpoints(RAM_BOUNDARIES, ram_size)
+
+
+def utf8_breakpoints():
+    return breakpoints(UTF8_BOUNDARIES, utf8_size)
+
+
+def bytes_per_char(ucp):
+    """Bytes per character of a str holding ucp as its widest character."""
+    return 1 if ucp < 256 else 2 if ucp < 65536 else 4
+
+
+def encoded_size(ucp, encoding):
+    if ucp in SURROGATES:
+        return None
+    return len(chr(ucp).encode(encoding))
+
+
+def size_table():
+    """Return one row per range of code points where no size changes.
+
+    Each row: (first, last, kind, bytes per char in RAM, sys.getsizeof of a
+    1-character str, UTF-8, UTF-16 and UTF-32 bytes, None for surrogates).
+    """
+    bounds = sorted(
+        set(RAM_BOUNDARIES)
+        | set(UTF8_BOUNDARIES)
+        | {SURROGATES.start, SURROGATES.stop, sys.maxunicode + 1}
+    )
+    rows = []
+    for first, stop in zip(bounds, bounds[1:]):
+        width = bytes_per_char(first)
+        kind = "ASCII" if first < 128 else KINDS[width]
+        rows.append(
+            (
+                first,
+                stop - 1,
+                kind,
+                width,
+                ram_size(first),
+                encoded_size(first, "utf-8"),
+                encoded_size(first, "utf-16-le"),
+                encoded_size(first, "utf-32-le"),
+            )
+        )
+    return rows
+
+
+def print_breakpoints(title, header, rows):
+    print(title)
+    print(header)
+    for ucp, size in rows:
+        print(f"{ucp:10} {size:>14} {chr(ucp):>5}")
+
+
+def print_size_table(rows):
+    print("# SIZE PER CHARACTER (bytes)")
+    print(
+        f"{'CODE POINTS':>21}  {'KIND':<7} {'RAM/CHAR':>8} {'GETSIZEOF':>9} "
+        f"{'UTF-8':>5} {'UTF-16':>6} {'UTF-32':>6}"
+    )
+    for first, last, kind, width, getsizeof, utf8, utf16, utf32 in rows:
+        encoded = " ".join(
+            f"{'-' if size is None else size:>{column}}"
+            for size, column in ((utf8, 5), (utf16, 6), (utf32, 6))
+        )
+        print(f"{first:>9} .. {last:>8}  {kind:<7} {width:>8} {getsizeof:>9} {encoded}")
+
+
+def print_binary_examples():
+    # £ (U+00A3) and 䉡 (U+4261) as written in binary, padded and not.
+    print(hex(163))
+    print(f"{163:20b}")
+    print(f"{16993:020b}")
+    print(f"{16993:20b}")
+
+
+def check():
+    """Compare the breakpoints with a scan over every code point."""
+    started = time.perf_counter()
+    # Same ranges as the original script: sys.maxunicode itself is excluded.
+    ram = brute_force_breakpoints(range(sys.maxunicode), ram_size)
+    valid = (ucp for ucp in range(sys.maxunicode) if ucp not in SURROGATES)
+    utf8 = brute_force_breakpoints(valid, utf8_size)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    ok = ram == ram_breakpoints() and utf8 == utf8_breakpoints()
+    print(f"\n# CHECK: brute force {'matches' if ok else 'DIFFERS'} ({elapsed_ms:.0f} ms)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Size of the characters of a str")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Compare the results with a scan over every code point (slow)",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    ram = ram_breakpoints()
+    utf8 = utf8_breakpoints()
+    table = size_table()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print_breakpoints("# SIZE IN RAM", "CODE POINT    SIZE IN RAM  CHAR", ram)
+    print()
+    print_breakpoints("# SIZE IN UTF-8", "CODE POINT  SIZE IN UTF-8  CHAR", utf8)
+    print()
+    print_size_table(table)
+    print(f"\ncomputed in {elapsed_ms:.3f} ms")
+    print()
+    print_binary_examples()
 
+    if args.check and not check():
+        return 1
+    return 0
 
-print("# SIZE IN RAM")
-print("CODE POINT    SIZE IN RAM  CHAR")
-last_size_ram = 0
-for ucp in range(sys.maxunicode):
-    if last_size_ram == sys.getsizeof(chr(ucp)):
-        continue
-    last_size_ram = sys.getsizeof(chr(ucp))
-    print(f"{ucp:10} {last_size_ram:>14} {chr(ucp):>5}")
-
-print("\n# SIZE IN UTF-8")
-print("CODE POINT  SIZE IN UTF-8  CHAR")
-last_size_utf8 = 0
-badids = []
-surrogate_pairs = range(55296, 57343 + 1)
-valid_ucps = [_i for _i in range(sys.maxunicode) if _i not in surrogate_pairs]
-for ucp in valid_ucps:
-    if last_size_utf8 == sys.getsizeof(chr(ucp).encode("utf-8")):
-        continue
-    last_size_utf8 = sys.getsizeof(chr(ucp).encode("utf-8"))
-    print(f"{ucp:10} {last_size_utf8:>14} {chr(ucp):>5}")
-
-
-hex(163)
-print(f"{163:20b}")
-print(f"{16993:020b}")
-print(f"{16993:20b}")
 
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,181 @@
+"""
+Memory footprint of a string, in RAM and once encoded.
+
+For a str, bytes or text file, reports the PEP 393 kind CPython would use
+to store it, its sys.getsizeof, its size in UTF-8, UTF-16 and UTF-32, and the
+widest character: the one with the highest code point, which alone sets the
+number of bytes used by every character of the string (see the post
+"Comment quadrupler la taille d'une chaine en lui ajoutant un seul
+caractère ?").
+
+Files are read in chunks through an incremental decoder, so the size of a
+multi-GB text can be computed in constant memory without loading it.
+
+usage:
+python3 string_footprint.py FILE... [--encoding utf-8]
+python3 string_footprint.py -c "some text"
+
+from string_footprint import footprint
+footprint("abc€")            # str
+footprint(b"abc")            # bytes, decoded with encoding=
+footprint(Path("big.txt"))   # file path
+"""
+
+import argparse
+import codecs
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from calculer_la_taille_d_une_chaine_en_python import KINDS, bytes_per_char
+
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class Footprint:
+    length: int  # number of characters
+    kind: str  # "ASCII", "Latin-1", "UCS-2" or "UCS-4"
+    bytes_per_char: int
+    getsizeof: int  # sys.getsizeof of the whole str
+    utf8: int
+    utf16: int  # without BOM
+    utf32: int  # without BOM
+    widest_char: str | None  # highest code point, None for ""
+    widest_index: int | None  # first position of widest_char
+
+    @property
+    def kind_overhead(self):
+        """Bytes added by the widest character compared to an ASCII string."""
+        if self.widest_char is None:
+            return 0
+        return self.getsizeof - str_size(self.length, "a")
+
+
+def kind_of(char):
+    if char is None or ord(char) < 128:
+        return "ASCII"
+    return KINDS[bytes_per_char(ord(char))]
+
+
+def str_size(length, widest_char):
+    """sys.getsizeof of a str of length characters whose widest is widest_char.
+
+    Computed from two small strings of the same kind, so that the str itself
+    never needs to exist.
+    """
+    if length == 0 or widest_char is None:
+        return sys.getsizeof("")
+    if length == 1:
+        # Python 3.12 stores some 1-character strings differently.
+        return sys.getsizeof(widest_char)
+    width = bytes_per_char(ord(widest_char))
+    return sys.getsizeof(widest_char * 2) + (length - 2) * width
+
+
+class FootprintCounter:
+    """Accumulate the footprint of a text given in successive pieces."""
+
+    def __init__(self):
+        self.length = 0
+        self.utf8 = 0
+        self.utf16 = 0
+        self.widest_char = None
+        self.widest_index = None
+
+    def feed(self, text):
+        if not text:
+            return
+        widest = max(text)
+        if self.widest_char is None or widest > self.widest_char:
+            self.widest_char = widest
+            self.widest_index = self.length + text.index(widest)
+        self.length += len(text)
+        # surrogatepass: lone surrogates are valid in a str and count 3/2 bytes.
+        self.utf8 += len(text.encode("utf-8", "surrogatepass"))
+        self.utf16 += len(text.encode("utf-16-le", "surrogatepass"))
+
+    def result(self):
+        width = bytes_per_char(ord(self.widest_char)) if self.widest_char else 1
+        return Footprint(
+            length=self.length,
+            kind=kind_of(self.widest_char),
+            bytes_per_char=width,
+            getsizeof=str_size(self.length, self.widest_char),
+            utf8=self.utf8,
+            utf16=self.utf16,
+            utf32=4 * self.length,
+            widest_char=self.widest_char,
+            widest_index=self.widest_index,
+        )
+
+
+def footprint_of_str(text):
+    counter = FootprintCounter()
+    counter.feed(text)
+    return counter.result()
+
+
+def footprint_of_file(path, encoding="utf-8", chunk_size=CHUNK_SIZE):
+    """Footprint of the text of a file, read chunk_size bytes at a time."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    counter = FootprintCounter()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            counter.feed(decoder.decode(chunk))
+    counter.feed(decoder.decode(b"", final=True))
+    return counter.result()
+
+
+def footprint(value, encoding="utf-8", chunk_size=CHUNK_SIZE):
+    """Footprint of a str, of bytes decoded with encoding, or of a file path."""
+    if isinstance(value, str):
+        return footprint_of_str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return footprint_of_str(codecs.decode(bytes(value), encoding))
+    if isinstance(value, os.PathLike):
+        return footprint_of_file(value, encoding, chunk_size)
+    raise TypeError(f"expected str, bytes or a path, got {type(value).__name__}")
+
+
+def print_footprint(label, result):
+    print(f"# {label}")
+    print(f"characters      : {result.length}")
+    print(f"kind (PEP 393)  : {result.kind}, {result.bytes_per_char} byte(s) per character")
+    print(f"sys.getsizeof   : {result.getsizeof} bytes")
+    print(f"UTF-8           : {result.utf8} bytes")
+    print(f"UTF-16          : {result.utf16} bytes")
+    print(f"UTF-32          : {result.utf32} bytes")
+    if result.widest_char is not None:
+        print(
+            f"widest character: U+{ord(result.widest_char):04X} {result.widest_char!r} "
+            f"at index {result.widest_index}, "
+            f"+{result.kind_overhead} bytes compared to ASCII"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory footprint of a string")
+    parser.add_argument("files", nargs="*", type=Path, help="Text files to analyse")
+    parser.add_argument("-c", "--text", action="append", default=[], help="String to analyse")
+    parser.add_argument("--encoding", default="utf-8", help="Encoding of the files")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"Bytes read at a time from files (default: {CHUNK_SIZE})",
+    )
+    args = parser.parse_args()
+    if not args.files and not args.text:
+        parser.error("give at least one file or -c TEXT")
+
+    for text in args.text:
+        print_footprint(repr(text), footprint(text))
+    for path in args.files:
+        print_footprint(path, footprint(path, args.encoding, args.chunk_size))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of render_linuxes.py against the previous renderer.
+
+Builds a linuxes.yaml of --entries entries from copies of the real ones and
+times each renderer writing to /dev/null, with the peak memory traced by
+tracemalloc. "legacy" is the previous implementation: yaml.safe_load of the
+whole file then one print() per line. The markdown output of both is checked
+to be identical first.
+
+usage (from the post directory):
+python3 tools/bench_render_linuxes.py [--entries 5000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from distros import cache_path, iter_distros  # noqa: E402
+from render_linuxes import render, write_rendered  # noqa: E402
+
+
+def legacy_render(yaml_path: Path) -> None:
+    with open(yaml_path, "r", encoding="utf-8") as f:
+        distros = yaml.safe_load(f)
+
+    print('<div class="render_linuxes">')
+    for distro in distros:
+        name = distro["name"]
+        url_logo = distro.get("url-logo")
+
+        print(f"- {name}")
+        if url_logo:
+            print(f"  - logo: ![{name}]({url_logo}){{.logo}}")
+
+        for key, value in distro.items():
+            if key in {"name", "url-logo-dist", "url-logo"}:
+                continue
+            elif key == "urls":
+                urls = value if isinstance(value, list) else [value]
+                print("  - urls:")
+                for url in urls:
+                    print(f"    - [{url}]({url})")
+            else:
+                print(f"  - {key}: {value}")
+    print("</div>")
+
+
+def make_yaml(source: Path, target: Path, entries: int) -> None:
+    distros = yaml.safe_load(source.read_text(encoding="utf-8"))
+    copies = []
+    for index in range(entries):
+        distro = dict(distros[index % len(distros)])
+        distro["name"] = f"{distro['name']} {index}"
+        copies.append(distro)
+    target.write_text(yaml.safe_dump(copies, allow_unicode=True, sort_keys=False), encoding="utf-8")
+
+
+def measure(func, repeat: int) -> tuple[float, int]:
+    """Return the best time in seconds and the peak traced memory in bytes."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark render_linuxes.py")
+    parser.add_argument("--entries", type=int, default=5000, help="Number of entries")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per renderer, best kept")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yaml_path = Path(tmp_dir) / "linuxes.yaml"
+        make_yaml(Path("linuxes.yaml"), yaml_path, args.entries)
+
+        legacy_out = io.StringIO()
+        with contextlib.redirect_stdout(legacy_out):
+            legacy_render(yaml_path)
+        new_out = io.StringIO()
+        # No optimised logos, like the legacy renderer, even if optimize_logos.py ran.
+        write_rendered(render(iter_distros(yaml_path, use_cache=False), optimized_logos={}), new_out)
+        if legacy_out.getvalue() != new_out.getvalue():
+            print("ERROR: markdown output differs from the legacy renderer", file=sys.stderr)
+            return 1
+
+        try:
+            with open(os.devnull, "w", encoding="utf-8") as devnull:
+
+                def legacy() -> None:
+                    with contextlib.redirect_stdout(devnull):
+                        legacy_render(yaml_path)
+
+                def streamed(output_format: str, use_cache: bool):
+                    return lambda: write_rendered(
+                        render(iter_distros(yaml_path, use_cache), output_format, {}), devnull
+                    )
+
+                list(iter_distros(yaml_path))  # warm the pickle cache
+                cases = [
+                    ("legacy", legacy),
+                    ("markdown", streamed("markdown", False)),
+                    ("markdown (cached)", streamed("markdown", True)),
+                    ("html", streamed("html", False)),
+                    ("html (cached)", streamed("html", True)),
+                ]
+                print(f"{args.entries} entries:")
+                for label, func in cases:
+                    seconds, peak = measure(func, args.repeat)
+                    print(
+                        f"  {label:<18} {seconds * 1000:9.1f} ms  "
+                        f"{args.entries / seconds:10.0f} entries/s  peak {peak / 1024:9.1f} KiB"
+                    )
+        finally:
+            # The pickle cache of the temporary YAML is written next to distros.py.
+            cache_path(yaml_path).unlink(missing_ok=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+"""Load and validate linuxes.yaml, shared by the tools of this post.
+
+Entries are checked against the Distro record, so a malformed entry fails
+with its index and the problem instead of a KeyError halfway through a
+render. YAML is parsed with the libyaml CSafeLoader when PyYAML was built
+with it, and the validated records are cached in a pickle next to this
+module (tools/__pycache__), one per YAML path and keyed on its mtime and
+size, so that repeated renders during quarto preview skip parsing.
+
+iter_distros() streams the entries one at a time, from the YAML file or the
+cache, so that memory use does not grow with the number of entries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+import yaml
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+CACHE_DIR = Path(__file__).resolve().parent / "__pycache__"
+# Bump when Distro changes, so that older pickles are ignored.
+CACHE_VERSION = 2
+KNOWN_KEYS = ("name", "urls", "url-logo", "url-logo-dist")
+
+
+class DistroError(ValueError):
+    """linuxes.yaml does not match the expected schema."""
+
+
+@dataclass(slots=True)
+class Distro:
+    name: str
+    urls: tuple[str, ...] = ()
+    url_logo: str | None = None
+    url_logo_dist: str | None = None
+    # Other keys (expertise, usage, abstract...), in file order.
+    extra: dict[str, Any] = field(default_factory=dict)
+    # Every key of the entry, in file order, for rendering.
+    keys: tuple[str, ...] = ()
+
+    def items(self) -> list[tuple[str, Any]]:
+        """Return (key, value) pairs in file order, except name and logos."""
+        items = []
+        for key in self.keys:
+            if key == "urls":
+                items.append((key, list(self.urls)))
+            elif key in self.extra:
+                items.append((key, self.extra[key]))
+        return items
+
+
+def optional_str(entry: dict, key: str, where: str) -> str | None:
+    value = entry.get(key)
+    if value is not None and not isinstance(value, str):
+        raise DistroError(f"{where}: '{key}' must be a string")
+    return value or None
+
+
+def parse_distro(entry: Any, index: int) -> Distro:
+    where = f"entry {index}"
+    if not isinstance(entry, dict):
+        raise DistroError(f"{where}: expected a mapping, got {type(entry).__name__}")
+    name = entry.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise DistroError(f"{where}: missing or empty 'name'")
+    where = f"entry {index} ({name})"
+
+    urls = entry.get("urls", [])
+    if urls is None:
+        urls = []
+    elif isinstance(urls, str):
+        urls = [urls]
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        raise DistroError(f"{where}: 'urls' must be a string or a list of strings")
+
+    return Distro(
+        name=name,
+        urls=tuple(urls),
+        url_logo=optional_str(entry, "url-logo", where),
+        url_logo_dist=optional_str(entry, "url-logo-dist", where),
+        extra={key: value for key, value in entry.items() if key not in KNOWN_KEYS},
+        keys=tuple(str(key) for key in entry),
+    )
+
+
+def compose_node(loader: Any, anchors: dict[str, yaml.Node]) -> yaml.Node:
+    """Build the node of the next value from parser events.
+
+    Works with the C parser too, which has no public compose_node(). anchors
+    maps the anchors seen so far in the document to their nodes.
+    """
+    event = loader.get_event()
+    if isinstance(event, yaml.AliasEvent):
+        if event.anchor not in anchors:
+            raise DistroError(f"{event.start_mark}: unknown alias {event.anchor!r}")
+        return anchors[event.anchor]
+    if isinstance(event, yaml.ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+        node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, event.style)
+    elif isinstance(event, yaml.SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(yaml.SequenceNode, None, event.implicit)
+        node = yaml.SequenceNode(tag, [], event.start_mark, None, event.flow_style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        while not loader.check_event(yaml.SequenceEndEvent):
+            node.value.append(compose_node(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+    elif isinstance(event, yaml.MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(yaml.MappingNode, None, event.implicit)
+        node = yaml.MappingNode(tag, [], event.start_mark, None, event.flow_style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = compose_node(loader, anchors)
+            node.value.append((key, compose_node(loader, anchors)))
+        node.end_mark = loader.get_event().end_mark
+    else:
+        raise DistroError(f"{event.start_mark}: unexpected {type(event).__name__}")
+    if event.anchor is not None:
+        anchors[event.anchor] = node
+    return node
+
+
+def iter_yaml_sequence(stream: IO[str]) -> Iterator[Any]:
+    """Yield the items of a YAML document whose root is a list, one at a time."""
+    loader = SafeLoader(stream)
+    try:
+        loader.get_event()  # StreamStartEvent
+        if loader.check_event(yaml.StreamEndEvent):
+            raise DistroError("YAML root must be a list of distributions")
+        loader.get_event()  # DocumentStartEvent
+        if not loader.check_event(yaml.SequenceStartEvent):
+            raise DistroError("YAML root must be a list of distributions")
+        loader.get_event()
+        anchors: dict[str, yaml.Node] = {}
+        while not loader.check_event(yaml.SequenceEndEvent):
+            yield loader.construct_document(compose_node(loader, anchors))
+    finally:
+        loader.dispose()
+
+
+def cache_path(yaml_path: Path) -> Path:
+    # The path hash keeps two files of the same name (the benchmark renders a
+    # temporary linuxes.yaml) from evicting each other's cache.
+    path_hash = hashlib.sha256(str(yaml_path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return CACHE_DIR / f"{yaml_path.name}.{path_hash}.pickle"
+
+
+def iter_cached(pickle_path: Path, key: tuple) -> Iterator[Distro] | None:
+    """Return an iterator over the cached entries, or None if stale."""
+    try:
+        f = pickle_path.open("rb")
+    except OSError:
+        return None
+    try:
+        if pickle.load(f) != key:
+            f.close()
+            return None
+    except Exception:
+        f.close()
+        return None
+
+    def entries() -> Iterator[Distro]:
+        # The cache is a pickle of the key, then one pickle per entry, then None.
+        with f:
+            while (distro := pickle.load(f)) is not None:
+                yield distro
+
+    return entries()
+
+
+def iter_distros(
+    yaml_path: Path = Path("linuxes.yaml"), use_cache: bool = True
+) -> Iterator[Distro]:
+    """Yield the validated entries of yaml_path, from the cache if fresh."""
+    stat = yaml_path.stat()
+    key = (CACHE_VERSION, str(yaml_path.resolve()), stat.st_mtime_ns, stat.st_size)
+    pickle_path = cache_path(yaml_path)
+    cached = iter_cached(pickle_path, key) if use_cache else None
+    if cached is not None:
+        yield from cached
+        return
+
+    tmp_file = None
+    tmp_path = pickle_path.with_name(f"{pickle_path.name}.{os.getpid()}.tmp")
+    if use_cache:
+        try:
+            pickle_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = tmp_path.open("wb")
+            pickle.dump(key, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            tmp_file = None  # read-only checkout: just parse again next time
+    try:
+        with yaml_path.open("r", encoding="utf-8") as stream:
+            for index, entry in enumerate(iter_yaml_sequence(stream)):
+                distro = parse_distro(entry, index)
+                if tmp_file is not None:
+                    pickle.dump(distro, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+                yield distro
+        if tmp_file is not None:
+            pickle.dump(None, tmp_file)
+            tmp_file.close()
+            os.replace(tmp_path, pickle_path)
+            tmp_file = None
+    finally:
+        # Only a complete pass over the file replaces the cache.
+        if tmp_file is not None:
+            tmp_file.close()
+            tmp_path.unlink(missing_ok=True)
+
+
+def load_distros(yaml_path: Path = Path("linuxes.yaml"), use_cache: bool = True) -> list[Distro]:
+    """Return the validated entries of yaml_path, from the cache if fresh."""
+    return list(iter_distros(yaml_path, use_cache))
@@ -1,17 +1,56 @@
 #!/usr/bin/env python3
-"""Download distro logos listed in linuxes.yaml into an images directory."""
+"""Download distro logos listed in linuxes.yaml into an images directory.
+
+Logos are fetched by a pool of --concurrency threads. Each thread keeps one
+keep-alive connection per host, and requests to the same host are spaced by
+at least --delay seconds whatever the number of threads. The http_proxy,
+https_proxy and no_proxy environment variables are honoured, as by urllib:
+HTTPS goes through a CONNECT tunnel.
+
+The ETag, Last-Modified and SHA-256 of each logo are kept in
+images/.logo-cache.json. With --refresh, existing logos are revalidated with
+a conditional GET and only downloaded again when the server has a new
+version. Bodies are streamed to a temporary file that replaces the logo once
+complete, so an interrupted run never leaves a truncated logo behind.
+
+Failed downloads are retried by a RetryPolicy: client errors such as 404 are
+permanent and never retried, 408/429/5xx and network errors are retried after
+Retry-After or a fully jittered exponential backoff, and the number of
+retries of the whole run is capped by --retry-budget. A per-host latency and
+failure histogram is printed at the end.
+"""
 
 from __future__ import annotations
 
 import argparse
+import base64
+import email.utils
+import hashlib
+import http.client
+import json
+import os
+import random
 import re
+import ssl
 import sys
+import threading
 import time
+import urllib.error
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import yaml
+from distros import load_distros
+
+USER_AGENT = "logo-downloader/1.0"
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 10
+CHUNK_SIZE = 64 * 1024
+CACHE_FILENAME = ".logo-cache.json"
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
 
 
 def slugify(value: str) -> str:
@@ -29,37 +68,388 @@ def extension_from_url(url: str) -> str:
     return ".img"
 
 
-def load_yaml(path: Path):
-    with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-    if not isinstance(data, list):
-        raise ValueError("YAML root must be a list of distributions")
-    return data
+class RedirectLoopError(ValueError):
+    """More than MAX_REDIRECTS redirects; permanent, so never retried."""
+
+
+class HostRateLimiter:
+    """Space requests to the same host by at least interval seconds."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = max(interval, 0.0)
+        self.lock = threading.Lock()
+        self.next_slot: dict[str, float] = {}
+
+    def wait(self, host: str) -> None:
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class HostStats:
+    """Latency of each request and failures, by host."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.failures: dict[str, dict[str, int]] = {}
+
+    def record(self, host: str, seconds: float, failure: str | None = None) -> None:
+        with self.lock:
+            self.latencies.setdefault(host, []).append(seconds)
+            if failure:
+                host_failures = self.failures.setdefault(host, {})
+                host_failures[failure] = host_failures.get(failure, 0) + 1
+
+    def print_report(self, file=sys.stdout) -> None:
+        labels = [f"<{bound * 1000:.0f}ms" for bound in LATENCY_BUCKETS[:-1]]
+        labels.append(f">={LATENCY_BUCKETS[-2] * 1000:.0f}ms")
+        with self.lock:
+            for host in sorted(self.latencies):
+                latencies = sorted(self.latencies[host])
+                counts = [0] * len(LATENCY_BUCKETS)
+                for seconds in latencies:
+                    counts[next(i for i, b in enumerate(LATENCY_BUCKETS) if seconds < b)] += 1
+                median = latencies[len(latencies) // 2]
+                print(
+                    f"Host {host}: requests={len(latencies)} "
+                    f"p50={median * 1000:.0f}ms max={latencies[-1] * 1000:.0f}ms",
+                    file=file,
+                )
+                print(
+                    "  latency " + " ".join(f"{l}:{c}" for l, c in zip(labels, counts) if c),
+                    file=file,
+                )
+                failures = self.failures.get(host)
+                if failures:
+                    print(
+                        "  failures "
+                        + " ".join(f"{kind}:{count}" for kind, count in sorted(failures.items())),
+                        file=file,
+                    )
+
+
+class RetryPolicy:
+    """Decide whether and when a failed download is tried again.
+
+    Retries of all downloads draw from one budget, so that a run with many
+    dead or rate-limited URLs still ends quickly.
+    """
+
+    def __init__(
+        self,
+        retries: int = 5,
+        backoff_base: float = 1.0,
+        max_delay: float = 30.0,
+        budget: int = 20,
+    ) -> None:
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.max_delay = max_delay
+        self.budget = budget
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def is_transient(exc: Exception) -> bool:
+        if isinstance(exc, urllib.error.HTTPError):
+            return exc.code in TRANSIENT_STATUSES
+        if isinstance(exc, (ssl.SSLCertVerificationError, ValueError)):
+            return False
+        return isinstance(exc, (OSError, http.client.HTTPException))
+
+    @staticmethod
+    def retry_after(exc: Exception) -> float | None:
+        """Delay asked by the server in a Retry-After header, in seconds."""
+        headers = getattr(exc, "headers", None)
+        value = headers.get("Retry-After") if headers else None
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(when.timestamp() - time.time(), 0.0)
+
+    def take_retry(self) -> bool:
+        with self.lock:
+            if self.budget <= 0:
+                return False
+            self.budget -= 1
+            return True
+
+    def delay(self, exc: Exception, attempt: int) -> float | None:
+        """Seconds to wait before retry number attempt + 1, or None to give up."""
+        if attempt >= self.retries or not self.is_transient(exc):
+            return None
+        retry_after = self.retry_after(exc)
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        if not self.take_retry():
+            return None
+        if retry_after is not None:
+            return retry_after
+        # Full jitter: uniform between 0 and the exponential backoff.
+        return random.uniform(0, min(self.max_delay, self.backoff_base * 2**attempt))
+
+
+class HttpSession:
+    """Thread-safe HTTP client with per-thread keep-alive connections."""
+
+    def __init__(
+        self, timeout: float, limiter: HostRateLimiter, stats: HostStats | None = None
+    ) -> None:
+        self.timeout = timeout
+        self.limiter = limiter
+        self.stats = stats or HostStats()
+        self.local = threading.local()
+        self.proxies = urllib.request.getproxies()
+
+    def proxy_for(self, scheme: str, netloc: str) -> urllib.parse.SplitResult | None:
+        """Return the proxy to reach netloc through, None to connect directly."""
+        proxy = self.proxies.get(scheme)
+        host = urllib.parse.urlsplit(f"//{netloc}").hostname or netloc
+        if not proxy or urllib.request.proxy_bypass(host):
+            return None
+        return urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+    @staticmethod
+    def proxy_headers(proxy: urllib.parse.SplitResult) -> dict[str, str]:
+        if proxy.username is None:
+            return {}
+        credentials = (
+            f"{urllib.parse.unquote(proxy.username)}:{urllib.parse.unquote(proxy.password or '')}"
+        )
+        token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+        return {"Proxy-Authorization": f"Basic {token}"}
+
+    def connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connections = self.local.__dict__.setdefault("connections", {})
+        conn = connections.get((scheme, netloc))
+        if conn is None:
+            proxy = self.proxy_for(scheme, netloc)
+            conn_class = (
+                http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            )
+            if proxy is None:
+                conn = conn_class(netloc, timeout=self.timeout)
+            else:
+                conn = conn_class(proxy.hostname, proxy.port or 80, timeout=self.timeout)
+                if scheme == "https":
+                    # TLS to the target host, inside a CONNECT tunnel.
+                    target = urllib.parse.urlsplit(f"//{netloc}")
+                    conn.set_tunnel(
+                        target.hostname, target.port, headers=self.proxy_headers(proxy)
+                    )
+            connections[(scheme, netloc)] = conn
+        return conn
+
+    def drop(self, scheme: str, netloc: str) -> None:
+        conn = self.local.__dict__.get("connections", {}).pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def reset(self) -> None:
+        """Close this thread's connections, e.g. after a body was not fully read."""
+        for conn in self.local.__dict__.pop("connections", {}).values():
+            conn.close()
+
+    def request(self, url: str, headers: dict[str, str]) -> http.client.HTTPResponse:
+        """Send one GET without following redirects.
+
+        A kept-alive connection the server closed in the meantime is reopened
+        once. The caller must read the whole body before the next request.
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in {"http", "https"}:
+            raise ValueError(f"unsupported URL scheme: {url}")
+        path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        headers = {"User-Agent": USER_AGENT, **headers}
+        proxy = self.proxy_for(parts.scheme, parts.netloc)
+        if proxy is not None and parts.scheme == "http":
+            # A plain HTTP proxy takes the absolute URL.
+            path = urllib.parse.urlunsplit(("http", parts.netloc, path, "", ""))
+            headers.update(self.proxy_headers(proxy))
+        self.limiter.wait(parts.netloc)
+        started = time.monotonic()
+        for attempt in range(2):
+            conn = self.connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as exc:
+                self.drop(parts.scheme, parts.netloc)
+                if attempt:
+                    self.stats.record(parts.netloc, time.monotonic() - started, type(exc).__name__)
+                    raise
+                continue
+            except Exception as exc:
+                self.drop(parts.scheme, parts.netloc)
+                self.stats.record(parts.netloc, time.monotonic() - started, type(exc).__name__)
+                raise
+            failure = str(response.status) if response.status >= 400 else None
+            self.stats.record(parts.netloc, time.monotonic() - started, failure)
+            if response.will_close:
+                # Forget it now, the response still reads from its socket.
+                self.local.connections.pop((parts.scheme, parts.netloc), None)
+            return response
+        raise AssertionError("unreachable")
+
+    def open(self, url: str, headers: dict[str, str] | None = None) -> http.client.HTTPResponse:
+        """Return the response to a GET of url, following redirects.
+
+        The returned response is a 2xx or a 304 whose body is still unread.
+        Raises urllib.error.HTTPError for any other final status.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self.request(url, headers or {})
+            if response.status in REDIRECT_STATUSES and response.getheader("Location"):
+                response.read()
+                url = urllib.parse.urljoin(url, response.getheader("Location"))
+                continue
+            if not (200 <= response.status < 300 or response.status == 304):
+                response.read()
+                raise urllib.error.HTTPError(
+                    url, response.status, response.reason, response.headers, None
+                )
+            return response
+        raise RedirectLoopError(f"too many redirects: {url}")
+
+
+class LogoCache:
+    """Validators and content hash of each downloaded logo, by file name."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        self.entries: dict[str, dict[str, str]] = data if isinstance(data, dict) else {}
+
+    def get(self, destination: Path) -> dict[str, str]:
+        with self.lock:
+            return dict(self.entries.get(destination.name, {}))
+
+    def set(self, destination: Path, entry: dict[str, str]) -> None:
+        with self.lock:
+            self.entries[destination.name] = entry
+
+    def save(self) -> None:
+        with self.lock:
+            text = json.dumps(self.entries, indent=2, sort_keys=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(text + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def file_sha256(path: Path) -> str | None:
+    digest = hashlib.sha256()
+    try:
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def conditional_headers(url: str, destination: Path, entry: dict[str, str]) -> dict[str, str]:
+    """Validators to send for destination, if the local copy is the cached one."""
+    if entry.get("url") != url or file_sha256(destination) != entry.get("sha256"):
+        return {}
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def download(
+    url: str, destination: Path, session: HttpSession, entry: dict[str, str]
+) -> dict[str, str] | None:
+    """Fetch url into destination and return its new cache entry.
+
+    Returns None when the server answered 304 Not Modified.
+    """
+    response = session.open(url, conditional_headers(url, destination, entry))
+    if response.status == 304:
+        response.read()
+        return None
+
+    digest = hashlib.sha256()
+    tmp_path = destination.with_name(f".{destination.name}.part")
+    try:
+        with tmp_path.open("wb") as f:
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                f.write(chunk)
+                digest.update(chunk)
+        if response.length:
+            # read(amt) returns b"" instead of raising when the server
+            # closes the connection before Content-Length bytes were sent.
+            raise http.client.IncompleteRead(b"", response.length)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        session.reset()
+        raise
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return {
+        "url": url,
+        "etag": response.getheader("ETag") or "",
+        "last_modified": response.getheader("Last-Modified") or "",
+        "sha256": digest.hexdigest(),
+    }
 
 
 def download_with_retries(
     url: str,
     destination: Path,
-    timeout: int = 30,
-    retries: int = 5,
-    backoff_base: float = 1.5,
-) -> None:
-    req = urllib.request.Request(url, headers={"User-Agent": "logo-downloader/1.0"})
-    last_exc = None
-    for attempt in range(retries + 1):
+    session: HttpSession,
+    cache: LogoCache,
+    policy: RetryPolicy,
+) -> bool:
+    """Download url into destination; return False if it was not modified."""
+    attempt = 0
+    while True:
         try:
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                content = response.read()
-            destination.write_bytes(content)
-            return
+            entry = download(url, destination, session, cache.get(destination))
         except Exception as exc:
-            last_exc = exc
-            if attempt >= retries:
-                break
-            sleep_s = backoff_base**attempt
+            sleep_s = policy.delay(exc, attempt)
+            if sleep_s is None:
+                raise
             time.sleep(sleep_s)
-    if last_exc:
-        raise last_exc
+            attempt += 1
+            continue
+        if entry is None:
+            return False
+        cache.set(destination, entry)
+        return True
+
+
+def fetch_logo(
+    name: str,
+    logo_url: str,
+    destination: Path,
+    session: HttpSession,
+    cache: LogoCache,
+    policy: RetryPolicy,
+) -> tuple[str, str]:
+    """Download one logo and return its status ("OK", "SKIP" or "FAIL") and message."""
+    try:
+        modified = download_with_retries(logo_url, destination, session, cache, policy)
+    except Exception as exc:
+        return "FAIL", f"{name}: {logo_url} ({exc})"
+    if not modified:
+        return "SKIP", f"{name}: not modified ({destination})"
+    return "OK", f"{name}: {destination}"
 
 
 def main() -> int:
@@ -69,12 +459,23 @@ def main() -> int:
         action="store_true",
         help="Force download even if the file already exists",
     )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Revalidate existing files with a conditional GET and update changed ones",
+    )
     parser.add_argument("--timeout", type=int, default=30, help="HTTP timeout in seconds")
     parser.add_argument(
         "--delay",
         type=float,
         default=1.0,
-        help="Delay in seconds between each distro download attempt",
+        help="Minimum delay in seconds between two requests to the same host",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of logos downloaded in parallel",
     )
     parser.add_argument(
         "--retries",
@@ -82,6 +483,18 @@ def main() -> int:
         default=5,
         help="Number of retries per logo on network/rate-limit errors",
     )
+    parser.add_argument(
+        "--retry-budget",
+        type=int,
+        default=20,
+        help="Maximum number of retries for the whole run",
+    )
+    parser.add_argument(
+        "--max-retry-delay",
+        type=float,
+        default=30.0,
+        help="Longest wait before a retry; longer Retry-After values fail the logo",
+    )
     args = parser.parse_args()
 
     yaml_path = Path("linuxes.yaml")
@@ -92,7 +505,7 @@ def main() -> int:
         return 1
 
     try:
-        distros = load_yaml(yaml_path)
+        distros = load_distros(yaml_path)
     except Exception as exc:
         print(f"ERROR: Failed to load YAML: {exc}", file=sys.stderr)
         return 1
@@ -103,36 +516,60 @@ def main() -> int:
     skipped = 0
     failed = 0
 
-    for distro in distros:
-        name = distro.get("name")
-        logo_url = distro.get("url-logo-dist")
-        if not name or not logo_url:
-            skipped += 1
-            continue
+    session = HttpSession(args.timeout, HostRateLimiter(args.delay))
+    cache = LogoCache(out_dir / CACHE_FILENAME)
+    policy = RetryPolicy(
+        retries=args.retries, max_delay=args.max_retry_delay, budget=args.retry_budget
+    )
+    with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as executor:
+        # Downloads run in the background; results are reported in YAML order.
+        reports = []
+        for distro in distros:
+            name = distro.name
+            logo_url = distro.url_logo_dist
+            if not logo_url:
+                skipped += 1
+                continue
 
-        filename = f"{slugify(str(name))}{extension_from_url(str(logo_url))}"
-        destination = out_dir / filename
+            filename = f"{slugify(name)}{extension_from_url(logo_url)}"
+            destination = out_dir / filename
 
-        if destination.exists() and not args.force:
-            print(f"SKIP  {name}: already exists ({destination})")
-            skipped += 1
-            continue
-
-        try:
-            download_with_retries(
-                str(logo_url),
-                destination,
-                timeout=args.timeout,
-                retries=args.retries,
+            if args.force:
+                # Drop the validators so that the full logo is sent again.
+                cache.set(destination, {})
+            elif destination.exists() and not args.refresh:
+                reports.append(f"{name}: already exists ({destination})")
+                continue
+            reports.append(
+                executor.submit(
+                    fetch_logo,
+                    name,
+                    logo_url,
+                    destination,
+                    session,
+                    cache,
+                    policy,
+                )
             )
-            print(f"OK    {name}: {destination}")
-            downloaded += 1
-        except Exception as exc:
-            print(f"FAIL  {name}: {logo_url} ({exc})", file=sys.stderr)
-            failed += 1
-        finally:
-            time.sleep(max(args.delay, 0.0))
 
+        for report in reports:
+            if isinstance(report, str):
+                print(f"SKIP  {report}")
+                skipped += 1
+                continue
+            status, message = report.result()
+            if status == "OK":
+                print(f"OK    {message}")
+                downloaded += 1
+            elif status == "SKIP":
+                print(f"SKIP  {message}")
+                skipped += 1
+            else:
+                print(f"FAIL  {message}", file=sys.stderr)
+                failed += 1
+
+    cache.save()
+    session.stats.print_report()
     print(f"Summary: downloaded={downloaded} skipped={skipped} failed={failed}")
     return 1 if failed else 0
 
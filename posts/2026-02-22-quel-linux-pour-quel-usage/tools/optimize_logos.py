@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Optimise the distro logos referenced by linuxes.yaml for the page.
+
+Run after get_logos.py, from the post directory. Each `url-logo` image is
+written to images/optimized/ under a name derived from its content hash, so
+identical logos are processed and shipped once:
+
+- SVGs are minified (comments, metadata, editor data and blank space
+  between tags removed), keeping the original if the result does not parse;
+- rasters are downscaled to the `.logo` display height, at 1x and 2x, and
+  saved as the smallest of their original format, WebP and (with --avif)
+  AVIF. This needs Pillow; without it rasters are copied unchanged.
+
+images/optimized/manifest.json maps each `url-logo` to the optimised `src`
+and `srcset`, for render_linuxes.py. Logos whose outputs already exist are
+not processed again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import urllib.parse
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from distros import load_distros
+
+try:
+    from PIL import Image, features
+except ImportError:  # optional dependency, rasters are copied unchanged
+    Image = None
+
+# Height of the .logo class in index.qmd, in CSS pixels.
+DISPLAY_HEIGHT = 50
+SCALES = (1, 2)
+OUT_DIR = Path("images/optimized")
+MANIFEST_PATH = OUT_DIR / "manifest.json"
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+
+XML_DECL_RE = re.compile(r"\A\s*<\?xml[^>]*\?>\s*")
+DOCTYPE_RE = re.compile(r"<!DOCTYPE[^>\[]*>\s*")
+COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+EDITOR_ELEMENT_RE = re.compile(
+    r"<(metadata|sodipodi:namedview)\b[^>]*?(?:/>|>.*?</\1\s*>)", re.DOTALL
+)
+EDITOR_ATTR_RE = re.compile(r'\s(?:inkscape|sodipodi):[\w.-]+="[^"]*"')
+INTER_TAG_SPACE_RE = re.compile(r">\s+<")
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def minify_svg(text: str) -> str:
+    """Return a smaller equivalent of the SVG text, or text itself."""
+    minified = XML_DECL_RE.sub("", text)
+    minified = DOCTYPE_RE.sub("", minified)
+    minified = COMMENT_RE.sub("", minified)
+    minified = EDITOR_ELEMENT_RE.sub("", minified)
+    minified = EDITOR_ATTR_RE.sub("", minified)
+    if "<text" not in minified:
+        # Blank space is only significant inside text elements.
+        minified = INTER_TAG_SPACE_RE.sub("><", minified)
+    minified = minified.strip()
+    try:
+        ET.fromstring(minified)
+    except ET.ParseError:
+        return text
+    return minified if len(minified) < len(text) else text
+
+
+def encode_raster(image, source_suffix: str, avif: bool) -> tuple[bytes, str]:
+    """Return the smallest encoding of image and its file suffix."""
+    lossless = source_suffix != ".jpg" and source_suffix != ".jpeg"
+    candidates = []
+
+    buffer = io.BytesIO()
+    if lossless:
+        image.save(buffer, format="PNG", optimize=True)
+        candidates.append((buffer.getvalue(), ".png"))
+    else:
+        image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+        candidates.append((buffer.getvalue(), ".jpg"))
+
+    if features.check("webp"):
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", lossless=lossless, quality=85, method=6)
+        candidates.append((buffer.getvalue(), ".webp"))
+    if avif and features.check("avif"):
+        buffer = io.BytesIO()
+        image.save(buffer, format="AVIF", quality=70)
+        candidates.append((buffer.getvalue(), ".avif"))
+
+    return min(candidates, key=lambda candidate: len(candidate[0]))
+
+
+def optimize_logo(source: Path, digest: str, out_dir: Path, avif: bool) -> dict:
+    """Write the optimised variants of source and return its manifest entry."""
+    stem = digest[:16]
+    suffix = source.suffix.lower()
+
+    if suffix == ".svg":
+        text = source.read_text(encoding="utf-8")
+        target = out_dir / f"{stem}.svg"
+        target.write_text(minify_svg(text), encoding="utf-8")
+        return {"files": [target.name], "srcset": [], "bytes": target.stat().st_size}
+
+    if Image is None or suffix not in RASTER_SUFFIXES:
+        target = out_dir / f"{stem}{suffix}"
+        shutil.copyfile(source, target)
+        return {"files": [target.name], "srcset": [], "bytes": target.stat().st_size}
+
+    with Image.open(source) as opened:
+        has_alpha = "A" in opened.getbands() or "transparency" in opened.info
+        image = opened.convert("RGBA" if has_alpha else "RGB")
+
+    files = []
+    srcset = []
+    previous_height = None
+    total_bytes = 0
+    for scale in SCALES:
+        height = min(image.height, DISPLAY_HEIGHT * scale)
+        if height == previous_height:
+            # The source is too small for this scale, reuse the previous one.
+            continue
+        previous_height = height
+        width = max(1, round(image.width * height / image.height))
+        variant = image
+        if height != image.height:
+            variant = image.resize((width, height), Image.LANCZOS)
+        data, variant_suffix = encode_raster(variant, suffix, avif)
+        target = out_dir / f"{stem}-{height}{variant_suffix}"
+        target.write_bytes(data)
+        files.append(target.name)
+        # Pixel density of the variant once displayed at DISPLAY_HEIGHT.
+        srcset.append(f"{target.name} {max(height / DISPLAY_HEIGHT, 1):g}x")
+        total_bytes += len(data)
+    return {"files": files, "srcset": srcset, "bytes": total_bytes}
+
+
+def logo_path(url_logo: str) -> Path:
+    return Path(urllib.parse.unquote(url_logo))
+
+
+def load_manifest(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_manifest(path: Path, manifest: dict) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Optimise the logos of linuxes.yaml")
+    parser.add_argument(
+        "--avif",
+        action="store_true",
+        help="Also try AVIF for rasters (needs Pillow built with AVIF support)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Optimise every logo even if its outputs already exist",
+    )
+    args = parser.parse_args()
+
+    yaml_path = Path("linuxes.yaml")
+    if not yaml_path.exists():
+        print(f"ERROR: YAML file not found: {yaml_path}", file=sys.stderr)
+        return 1
+    try:
+        distros = load_distros(yaml_path)
+    except Exception as exc:
+        print(f"ERROR: Failed to load YAML: {exc}", file=sys.stderr)
+        return 1
+    if Image is None:
+        print("WARNING: Pillow is not installed, rasters are copied unchanged", file=sys.stderr)
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(MANIFEST_PATH)
+    options = {"avif": args.avif, "pillow": Image is not None, "height": DISPLAY_HEIGHT}
+    previous_digests = previous.get("digests", {}) if previous.get("options") == options else {}
+
+    # url-logo -> digest, and one source per digest.
+    logo_digests: dict[str, str] = {}
+    sources: dict[str, Path] = {}
+    missing = 0
+    for distro in distros:
+        url_logo = distro.url_logo
+        if not url_logo:
+            continue
+        source = logo_path(url_logo)
+        if not source.is_file():
+            print(f"SKIP  {url_logo}: file not found", file=sys.stderr)
+            missing += 1
+            continue
+        digest = file_digest(source)
+        logo_digests[url_logo] = digest
+        sources.setdefault(digest, source)
+
+    digests: dict[str, dict] = {}
+    todo = []
+    for digest, source in sources.items():
+        entry = previous_digests.get(digest)
+        if (
+            entry
+            and not args.force
+            and all((OUT_DIR / name).is_file() for name in entry["files"])
+        ):
+            digests[digest] = entry
+        else:
+            todo.append((digest, source))
+
+    failed: set[str] = set()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(todo) or 1))) as executor:
+        futures = [
+            executor.submit(optimize_logo, source, digest, OUT_DIR, args.avif)
+            for digest, source in todo
+        ]
+        for (digest, source), future in zip(todo, futures):
+            try:
+                entry = future.result()
+            except (UnicodeDecodeError, OSError) as exc:
+                # An undecodable SVG or unreadable raster; skip it, not the run.
+                print(f"SKIP  {source}: {exc}", file=sys.stderr)
+                failed.add(digest)
+                continue
+            digests[digest] = entry
+            print(
+                f"OK    {source}: {source.stat().st_size} B -> {entry['bytes']} B "
+                f"({', '.join(entry['files'])})"
+            )
+
+    prefix = f"./{OUT_DIR.as_posix()}/"
+    logos = {}
+    for url_logo, digest in logo_digests.items():
+        if digest in failed:
+            continue
+        entry = digests[digest]
+        logos[url_logo] = {
+            "src": prefix + entry["files"][0],
+            "srcset": ", ".join(prefix + candidate for candidate in entry["srcset"]),
+        }
+    save_manifest(MANIFEST_PATH, {"options": options, "digests": digests, "logos": logos})
+
+    # Remove outputs of logos that are no longer referenced.
+    keep = {name for entry in digests.values() for name in entry["files"]} | {MANIFEST_PATH.name}
+    for path in OUT_DIR.iterdir():
+        if path.name not in keep:
+            path.unlink()
+
+    duplicates = len(logo_digests) - len(sources)
+    source_bytes = sum(source.stat().st_size for source in sources.values())
+    output_bytes = sum(entry["bytes"] for entry in digests.values())
+    print(
+        f"Summary: logos={len(logo_digests)} unique={len(sources)} duplicates={duplicates} "
+        f"optimized={len(todo) - len(failed)} skipped={len(failed)} missing={missing} "
+        f"bytes={source_bytes}->{output_bytes}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,27 +1,137 @@
 #!/usr/bin/env python3
-import yaml
+"""Render the distributions of linuxes.yaml for index.qmd.
 
+Entries are streamed from the loader and each one is rendered to a single
+string, written through one buffered writer. The output is either markdown
+(the default, read by pandoc) or pre-rendered HTML in a raw block, which
+pandoc passes through without parsing it.
 
-with open("linuxes.yaml", "r", encoding="utf-8") as f:
-    distros = yaml.safe_load(f)
+index.qmd runs this file with runpy.run_path(); it can also be run directly:
+python3 tools/render_linuxes.py [--format markdown|html]
+"""
 
-print('<div class="render_linuxes">')
-for distro in distros:
-    name = distro["name"]
-    url_logo = distro.get("url-logo")
+from __future__ import annotations
 
-    print(f"- {name}")
-    if url_logo:
-        print(f"  - logo: ![{name}]({url_logo}){{.logo}}")
+import argparse
+import html
+import json
+import os
+import sys
+from typing import IO, Iterable, Iterator
+
+# Run with runpy from index.qmd, which does not put tools/ on sys.path.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from distros import Distro, iter_distros  # noqa: E402
+
+FORMATS = ("markdown", "html")
+# Written by tools/optimize_logos.py; original logos are used without it.
+OPTIMIZED_MANIFEST = "images/optimized/manifest.json"
+
+
+def load_optimized_logos() -> dict[str, dict[str, str]]:
+    try:
+        with open(OPTIMIZED_MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f).get("logos", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def logo_source(distro: Distro, optimized_logos: dict) -> tuple[str | None, str]:
+    """Return the (src, srcset) of the logo of distro."""
+    optimized = optimized_logos.get(distro.url_logo) if distro.url_logo else None
+    if optimized:
+        return optimized["src"], optimized.get("srcset", "")
+    return distro.url_logo, ""
+
+
+def render_markdown_entry(distro: Distro, optimized_logos: dict) -> str:
+    name = distro.name
+    lines = [f"- {name}"]
+    src, srcset = logo_source(distro, optimized_logos)
+    if src and srcset:
+        lines.append(f'  - logo: ![{name}]({src}){{.logo srcset="{srcset}"}}')
+    elif src:
+        lines.append(f"  - logo: ![{name}]({src}){{.logo}}")
+
+    for key, value in distro.items():
+        if key == "urls":
+            lines.append("  - urls:")
+            lines.extend(f"    - [{url}]({url})" for url in value)
+        else:
+            lines.append(f"  - {key}: {value}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def render_html_entry(distro: Distro, optimized_logos: dict) -> str:
+    name = html.escape(distro.name)
+    parts = [f"<li>{name}<ul>"]
+    src, srcset = logo_source(distro, optimized_logos)
+    if src:
+        srcset_attr = f' srcset="{html.escape(srcset)}"' if srcset else ""
+        parts.append(
+            f'<li>logo: <img src="{html.escape(src)}"{srcset_attr} alt="{name}" class="logo"></li>'
+        )
 
     for key, value in distro.items():
-        if key in {"name", "url-logo-dist", "url-logo"}:
-            continue
-        elif key == "urls":
-            urls = value if isinstance(value, list) else [value]
-            print("  - urls:")
-            for url in urls:
-                print(f"    - [{url}]({url})")
+        if key == "urls":
+            parts.append("<li>urls:<ul>")
+            parts.extend(
+                f'<li><a href="{html.escape(url)}">{html.escape(url)}</a></li>' for url in value
+            )
+            parts.append("</ul></li>")
         else:
-            print(f"  - {key}: {value}")
-print('</div>')
+            parts.append(f"<li>{html.escape(key)}: {html.escape(str(value))}</li>")
+    parts.append("</ul></li>\n")
+    return "".join(parts)
+
+
+def render(
+    distros: Iterable[Distro],
+    output_format: str = "markdown",
+    optimized_logos: dict | None = None,
+) -> Iterator[str]:
+    """Yield the rendered output in chunks, one per distribution.
+
+    optimized_logos maps url-logo to its optimised logo, read from
+    OPTIMIZED_MANIFEST when None.
+    """
+    if optimized_logos is None:
+        optimized_logos = load_optimized_logos()
+    if output_format == "html":
+        yield '```{=html}\n<div class="render_linuxes"><ul>\n'
+        for distro in distros:
+            yield render_html_entry(distro, optimized_logos)
+        yield "</ul></div>\n```\n"
+        return
+
+    yield '<div class="render_linuxes">\n'
+    for distro in distros:
+        yield render_markdown_entry(distro, optimized_logos)
+    yield "</div>\n"
+
+
+def write_rendered(chunks: Iterable[str], out: IO[str]) -> None:
+    out.writelines(chunks)
+    out.flush()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Render linuxes.yaml for index.qmd")
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="markdown",
+        help="Output format (default: markdown)",
+    )
+    args = parser.parse_args(argv)
+    write_rendered(render(iter_distros(), args.format), sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+elif __name__ == "<run_path>":
+    # runpy.run_path("tools/render_linuxes.py") from index.qmd.
+    main([])
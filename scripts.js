@@ -1,6 +1,9 @@
-
+// Les liens externes reçoivent `target` et `rel` à la génération du site
+// (étape post-render `external_links_marked` de `_scripts/post_process_cleanup.py`).
+// Ce repli ne traite que les liens restés sans `target`, par exemple sur une
+// page qui n’est pas passée par le post-render.
 function targetBlank() {
-    const _a = document.getElementsByTagName("a");
+    const _a = document.querySelectorAll("a[href]:not([target])");
     const _siteHost = location.host.replace(/^www\./i, "");
     const internalRegex = new RegExp(_siteHost, "i");
 